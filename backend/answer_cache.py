@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Answers keyed by the embedding of a standalone question.
+
+    A lookup hits when the cosine similarity between the query vector and a
+    cached question is at least `similarity_threshold`. Entries expire after
+    `ttl_seconds`, the least recently used entry is evicted past
+    `max_entries`, and everything is dropped whenever `fingerprint()` (e.g. the
+    FAISS index mtime) changes.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.92, max_entries: int = 1000,
+                 ttl_seconds: float = 3600, fingerprint: Optional[Callable[[], object]] = None):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._fingerprint_fn = fingerprint
+        self._fingerprint = fingerprint() if fingerprint else None
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None  # rows follow self._keys
+        self._keys: List[str] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalise(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_fingerprint(self):
+        if self._fingerprint_fn is None:
+            return
+        fingerprint = self._fingerprint_fn()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+
+    def _remove(self, key: str):
+        del self._entries[key]
+        self._matrix = None
+
+    def clear(self):
+        self._entries.clear()
+        self._matrix = None
+
+    def lookup(self, vector) -> Optional[dict]:
+        self._check_fingerprint()
+        if self._entries:
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k]["vector"] for k in self._keys])
+            similarities = self._matrix @ self._normalise(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                key = self._keys[best]
+                entry = self._entries[key]
+                if time.time() - entry["created_at"] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return {"question": key, "answer": entry["answer"], "sources": entry["sources"],
+                            "products": entry["products"], "similarity": float(similarities[best])}
+                self._remove(key)
+        self.misses += 1
+        return None
+
+    def store(self, question: str, vector, answer: str, sources: List[str], products: List[str] = ()):
+        """Cache an answer; `products` are the retrieved products its intent score used."""
+        self._check_fingerprint()
+        if question in self._entries:
+            self._remove(question)
+        self._entries[question] = {
+            "vector": self._normalise(vector),
+            "answer": answer,
+            "sources": list(sources),
+            "products": list(products),
+            "created_at": time.time(),
+        }
+        self._matrix = None
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
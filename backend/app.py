@@ -1,52 +1,157 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from schemas import BotResponse, UserQuery
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from schemas import (BotResponse, ConversationScore, LeadPage, LeadSubmission, NudgeRequest, NudgeResponse,
+                     ScoreBatchRequest, ScoreBatchResponse, UserQuery)
 from dotenv import load_dotenv
 import os
-from embeddings import create_faiss_index
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
+from embeddings import get_embeddings
+from ingest import DOCS_DIR, INDEX_PATH, INDEX_SETTINGS, ingest, needs_rebuild
+from index_store import HybridRetriever, IndexStore, IndexStoreRetriever, fingerprint
 from langchain_core.prompts import ChatPromptTemplate  
-from typing import Dict
-from config import config, check_quick_faq
+from typing import Literal, Optional
+from config import config, check_quick_faq, quick_faq_result
+from answer_cache import SemanticAnswerCache
+from semantic_faq import SemanticFAQRouter
+from nudges import NudgeRules
+from leads import LEAD_TYPES, LeadStore, LeadWriter, parse_cursor
+from scoring import IntentScorer
+from sessions import Session, open_session_store
+from rag import RAGPipeline
+from providers import make_chat_model
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from tracing import LLMUsageCallback, TracingMiddleware, logger, request_id, set_outcome, stage
+import openai
+import traceback
+import resource
+import secrets
+import time
+from contextlib import asynccontextmanager, contextmanager, suppress
 import json
 from datetime import datetime
 
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index build/load and warm-up run in the background so uvicorn accepts
+    # connections at once; /readyz says when RAG answers are available
+    task = asyncio.create_task(warm_up())
+    lead_writer.start()
+    yield
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+    await lead_writer.stop()
 
-# CORS
+app = FastAPI(lifespan=lifespan)
+
+# CORS: only pages served from CORS_ORIGINS (comma-separated) may call the API
+# from a browser; the Streamlit frontend calls it server-side
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=[origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:8501").split(",")
+                   if origin.strip()],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization", "X-Request-ID"],
+    expose_headers=["X-Request-ID"],
+)
+# Request ids, per-stage timings and the slow-request log (see tracing.py)
+app.add_middleware(TracingMiddleware,
+                   slow_request_ms=config.get("observability", {}).get("slow_request_ms", 3000))
+
+# Global cap on RAG requests talking to the LLM at the same time
+MAX_CONCURRENT_LLM_CALLS = config.get("rag", {}).get("max_concurrent_llm_calls", 8)
+llm_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+
+embeddings = get_embeddings()
+
+def index_fingerprint():
+    # Changes whenever the index on disk is rebuilt
+    return fingerprint(INDEX_PATH)
+
+retrieval_config = config.get("retrieval", {})
+
+def load_retriever():
+    # Vectors are memory-mapped and chunk text is only read for the top-k hits;
+    # nprobe / ef_search from config.json apply here
+    store = IndexStore.open(INDEX_PATH, settings=INDEX_SETTINGS)
+    if not retrieval_config.get("hybrid", True):
+        return IndexStoreRetriever(store=store, embeddings=embeddings, k=INDEX_SETTINGS["k"])
+    # BM25 + vector hits fused by reciprocal rank; confident BM25 hits skip the embedding call
+    return HybridRetriever(
+        store=store,
+        embeddings=embeddings,
+        k=INDEX_SETTINGS["k"],
+        candidates=retrieval_config.get("candidates", 20),
+        rrf_k=retrieval_config.get("rrf_k", 60),
+        fast_path=retrieval_config.get("lexical_fast_path", True),
+        fast_path_min_confidence=retrieval_config.get("fast_path_min_confidence", 0.5),
+        fast_path_min_margin=retrieval_config.get("fast_path_min_margin", 1.5),
+    )
+
+def open_index():
+    """Build the index if needed, then open it; runs in a worker thread."""
+    if not IndexStore.exists(INDEX_PATH) or needs_rebuild(INDEX_PATH):
+        # Build the index from the documents directory (see ingest.py); a changed
+        # vector_index build setting is rebuilt from the stored vectors
+        ingest(DOCS_DIR, INDEX_PATH, embeddings)
+    print("[INFO] Loading existing index...")
+    return index_fingerprint(), load_retriever()
+
+# Set by the startup task once the index is open
+loaded_index_fingerprint = None
+
+# Semantic answer cache for standalone questions
+answer_cache_config = config.get("answer_cache", {})
+ANSWER_CACHE_ENABLED = answer_cache_config.get("enabled", True)
+answer_cache = SemanticAnswerCache(
+    similarity_threshold=answer_cache_config.get("similarity_threshold", 0.92),
+    max_entries=answer_cache_config.get("max_entries", 1000),
+    ttl_seconds=answer_cache_config.get("ttl_seconds", 3600),
+    fingerprint=index_fingerprint,
 )
 
-# Session-based storage
-session_memories: Dict[str, ConversationBufferMemory] = {}
-session_chains: Dict[str, ConversationalRetrievalChain] = {}
-session_question_counts: Dict[str, int] = {}  # Track questions per session
+# Paraphrases of quick FAQs ("what paperwork do I need") are routed by
+# embedding similarity; FAQ keywords and questions are embedded once, by the
+# startup task
+semantic_faq_config = config.get("semantic_faq", {})
+semantic_faqs = None
+
+# Time- and intent-based nudges for the landing page tabs
+nudge_rules = NudgeRules(config.get("tab_nudges", {}).get("rules", []))
 
-PDF_PATH = "/home/ayush/Projects_1/sales-bot/sales-bot-prediction/backend/finance_company_pricing.pdf"
-INDEX_PATH = "/home/ayush/Projects_1/sales-bot/sales-bot-prediction/backend/faiss_index_pricing"
+# Weighted intent scoring and the lead thresholds (see scoring.py)
+scoring_config = config.get("scoring", {})
+scorer = IntentScorer(scoring_config)
 
-if not os.path.exists(INDEX_PATH):
-    vectorstore, embeddings = create_faiss_index(PDF_PATH, INDEX_PATH)
-else:
-    print("[INFO] Loading existing FAISS index...")
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large", dimensions=300)
-    vectorstore = FAISS.load_local(INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+# Leads from the capture form: queued by POST /leads and written in batches
+# (see leads.py)
+lead_config = config.get("leads", {})
+lead_store = LeadStore(os.getenv("LEAD_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              lead_config.get("sqlite_path", "leads.sqlite3"))),
+                       lead_type=scorer.lead_type)
+# GET /leads returns contact details: it needs this token as a Bearer header.
+# POST /leads with it may also overwrite the name and session of a stored lead
+LEADS_API_TOKEN = os.getenv("LEADS_API_TOKEN", "")
+lead_writer = LeadWriter(
+    lead_store,
+    batch_size=lead_config.get("batch_size", 100),
+    flush_interval_seconds=lead_config.get("flush_interval_seconds", 0.5),
+    max_queue=lead_config.get("max_queue", 10000),
+)
 
-retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
+# LLM: ChatOpenAI, or the offline fake (see providers.py)
+llm = make_chat_model("gpt-3.5-turbo", temperature=0.2)
+# Token usage and in-flight calls for /metrics
+llm.callbacks = [LLMUsageCallback()]
 
-# LLM
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2, api_key=OPENAI_API_KEY)
+# Session-based storage: history and question count per session, evicted when
+# idle or over capacity. "memory" is per process; "sqlite" is shared by all
+# workers of `uvicorn --workers N` on this host (see sessions.py)
+sessions = open_session_store(config.get("sessions", {}), token_counter=llm.get_num_tokens,
+                              base_dir=os.path.dirname(os.path.abspath(__file__)))
 
 custom_prompt = ChatPromptTemplate.from_messages([
     ("system", """You are a helpful assistant for a finance company. Use the conversation history to maintain context about the user and their previous questions.
@@ -66,73 +171,487 @@ Context from documents:
 Current Question: {question}""")
 ])
 
-def get_or_create_chain(session_id: str) -> ConversationalRetrievalChain:
-    if session_id not in session_chains:
-        memory = ConversationBufferMemory(
-            memory_key="chat_history", 
-            k=10, 
-            return_messages=True,
-            output_key="answer"
-        )
-        session_memories[session_id] = memory
-        session_chains[session_id] = ConversationalRetrievalChain.from_llm(
-            llm=llm,
-            retriever=retriever,
-            memory=memory,
-            return_source_documents=False,
-            combine_docs_chain_kwargs={"prompt": custom_prompt}
-        )
-        session_question_counts[session_id] = 0
-    return session_chains[session_id]
+# One stateless RAG pipeline shared by every session; the startup task gives
+# it a retriever once the index is open
+rag_pipeline = RAGPipeline(llm, None, custom_prompt,
+                           mode=config.get("rag", {}).get("answer_mode", "condense"),
+                           max_context_tokens=config.get("rag", {}).get("max_context_tokens"))
+
+# Progress of the startup task: pending -> loading -> ready | failed, or disabled / skipped
+startup_config = config.get("startup", {})
+startup_state = {"index": "pending", "semantic_faq": "pending", "warm_up": "pending", "errors": {}}
+
+class NotReady(Exception):
+    """The RAG path is still warming up; quick FAQs are already answered."""
+
+async def startup_step(name: str, step):
+    startup_state[name] = "loading"
+    started = time.perf_counter()
+    try:
+        await step()
+    except Exception as e:
+        startup_state[name] = "failed"
+        startup_state["errors"][name] = f"{type(e).__name__}: {e}"
+        print(f"[ERROR] Startup step {name} failed: {type(e).__name__}: {e}")
+        print(traceback.format_exc())
+        return False
+    startup_state[name] = "ready"
+    print(f"[INFO] Startup step {name} ready in {time.perf_counter() - started:.1f}s")
+    return True
+
+async def load_index():
+    global loaded_index_fingerprint
+    loaded_index_fingerprint, rag_pipeline.retriever = await asyncio.to_thread(open_index)
+
+async def load_semantic_faqs():
+    global semantic_faqs
+    semantic_faqs = await asyncio.to_thread(
+        SemanticFAQRouter,
+        config.get("quick_faqs", {}),
+        embeddings,
+        similarity_threshold=semantic_faq_config.get("similarity_threshold", 0.75),
+    )
+
+async def warm_up_queries():
+    # Pre-embed common questions in one batch (the embedding cache then serves
+    # them) and run one retrieval to page the index in
+    queries = startup_config.get("warm_up_queries", [])
+    if queries:
+        await embeddings.aembed_documents(queries)
+        with retriever_in_use() as retriever:
+            await retriever.ainvoke(queries[0])
+
+async def warm_up():
+    if not semantic_faq_config.get("enabled", True):
+        startup_state["semantic_faq"] = "disabled"
+    steps = [startup_step("index", load_index)]
+    if semantic_faq_config.get("enabled", True):
+        steps.append(startup_step("semantic_faq", load_semantic_faqs))
+    index_ready, *_ = await asyncio.gather(*steps)
+    if not startup_config.get("warm_up", True) or not index_ready:
+        startup_state["warm_up"] = "disabled" if index_ready else "skipped"
+        return
+    await startup_step("warm_up", warm_up_queries)
+
+def rag_ready() -> bool:
+    return rag_pipeline.retriever is not None
+
+@contextmanager
+def retriever_in_use():
+    """The current retriever, with its index pinned until the block ends, so a
+    reload can't close it under a running request."""
+    retriever = rag_pipeline.retriever
+    with retriever.store.in_use():
+        yield retriever
+
+async def standalone_vector(session: Session, user_query: str):
+    """Embedding of the question if it is standalone, else None.
+
+    Only questions asked with no chat history are standalone as typed, so only
+    those go through semantic FAQ routing and the answer cache; follow-ups
+    would need an LLM call to condense first. The vector lands in the
+    embedding cache, so retrieving for the same question reuses it (and a
+    question the retriever answers from BM25 alone only skips the vector
+    search). Must be called inside `sessions.turn`.
+    """
+    if session.history or not (ANSWER_CACHE_ENABLED or semantic_faqs):
+        return None
+    with stage("embed_query"):
+        return await embeddings.aembed_query(user_query)
+
+async def cached_answer(session: Session, user_query: str, vector):
+    """Look a standalone question up in the answer cache."""
+    if not ANSWER_CACHE_ENABLED or vector is None:
+        return None
+    with stage("answer_cache"):
+        hit = answer_cache.lookup(vector)
+    if hit:
+        # Keep the session history consistent with what the user was shown
+        await add_turn(session, user_query, hit["answer"])
+    return hit
+
+# One reload at a time; requests arriving meanwhile wait and find it done
+index_reload_lock = asyncio.Lock()
+
+async def reload_index_if_changed():
+    """Swap in the index written by ingest.py without restarting the API."""
+    global loaded_index_fingerprint
+    if not rag_ready() or index_fingerprint() in (None, loaded_index_fingerprint):
+        return
+    async with index_reload_lock:
+        fingerprint = index_fingerprint()
+        if fingerprint is None or fingerprint == loaded_index_fingerprint:
+            return
+        try:
+            retriever = await asyncio.to_thread(load_retriever)
+        except Exception as e:
+            # Keep answering from the loaded index; the next request tries again
+            logger.error(f"{request_id()} Reloading the index failed: {type(e).__name__}: {e}")
+            return
+        previous = rag_pipeline.retriever
+        rag_pipeline.retriever = retriever
+        loaded_index_fingerprint = fingerprint
+    # Its sqlite connection and memory map go once the requests using it are done
+    previous.store.retire()
+    print("[INFO] Reloaded index after ingestion")
+
+def document_sources(docs) -> list:
+    sources = sorted({os.path.basename(doc.metadata.get("source", "")) for doc in docs} - {""})
+    return sources or ["Knowledge base"]
+
+def process_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Peak RSS; kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def faq_response(user_query: str) -> Optional[BotResponse]:
+    with stage("faq"):
+        return faq_bot_response(check_quick_faq(user_query), user_query)
+
+def semantic_faq_response(user_query: str, query_vector) -> Optional[BotResponse]:
+    with stage("semantic_faq"):
+        match = semantic_faqs.match(query_vector) if semantic_faqs and query_vector is not None else None
+    return faq_bot_response(quick_faq_result(*match), user_query) if match else None
+
+def retrieved_products(docs) -> list:
+    # The top retrieved chunk names the product when the question doesn't
+    return scorer.context_products(docs[0].page_content) if docs else []
+
+def intent_score(user_query: str, faq_category: Optional[str] = None, products=()) -> int:
+    return scorer.score_question(user_query, faq_category, products)
+
+def classified(response: BotResponse, conversation_score: int) -> BotResponse:
+    # The conversation's score so far plus this question decides the user type
+    total = conversation_score + response.intent_score
+    response.user_type = scorer.user_type(total)
+    response.lead_form = scorer.lead_form_due(total)
+    return response
+
+def faq_bot_response(faq_result: dict, user_query: str) -> Optional[BotResponse]:
+    if not faq_result["found"]:
+        return None
+
+    nudge = ""
+    # Add nudge based on FAQ category
+    if faq_result.get("category") == "eligibility":
+        nudge = config.get("nudges", {}).get("application_ready", "")
+    elif faq_result.get("category") == "documents_required":
+        nudge = config.get("nudges", {}).get("document_help", "")
+    elif faq_result.get("category") == "contact":
+        nudge = "Feel free to call us or visit our office!"
+
+    return BotResponse(
+        bot_response=faq_result["answer"],
+        sources=[faq_result["source"]],
+        is_instant_faq=True,
+        nudge=nudge if nudge else None,
+        intent_score=intent_score(user_query, faq_result.get("category"))
+    )
+
+def rag_nudge(question_count: int) -> Optional[str]:
+    # Check if we should prompt for lead capture
+    if question_count == 2:
+        return "I notice you have several questions. Would you like to share your contact details so our team can provide personalized assistance?"
+    return None
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Scraped from /metrics; the LLM and HTTP metrics live in tracing.py
+ASK_OUTCOMES = REGISTRY.counter("salesbot_ask_outcomes_total",
+                                "Answered questions by how they were answered.", ("outcome",))
+
+LOST_TURNS = REGISTRY.counter("salesbot_session_turns_lost_total",
+                              "Turns answered but not saved to the session history.")
+
+def record_outcome(outcome: str):
+    # How /ask was answered: faq, semantic_faq, cached or rag
+    ASK_OUTCOMES.inc(outcome=outcome)
+    set_outcome(outcome)
+
+async def add_turn(session: Session, question: str, answer: str):
+    # The user already has the answer, so a turn that can't be saved is logged, not raised
+    if not await sessions.add_turn(session, question, answer):
+        LOST_TURNS.inc()
+        logger.error(f"{request_id()} Gave up saving a turn of session {session.session_id} "
+                     f"after conflicting writes from other workers")
+
+def http_error(e: Exception) -> HTTPException:
+    """Map a failed question to a status the client can act on; the request id
+    ties the response to the logged traceback."""
+    if isinstance(e, NotReady):
+        status, message, headers = 503, "The assistant is still starting up, please retry shortly.", {"Retry-After": "5"}
+    elif isinstance(e, openai.RateLimitError):
+        status, message, headers = 503, "The assistant is busy, please retry shortly.", {"Retry-After": "5"}
+    elif isinstance(e, (openai.APITimeoutError, asyncio.TimeoutError)):
+        status, message, headers = 504, "The language model timed out.", None
+    elif isinstance(e, (openai.APIConnectionError, openai.APIStatusError)):
+        status, message, headers = 502, "The language model is unavailable.", None
+    else:
+        status, message, headers = 500, "Internal error while answering.", None
+    if not isinstance(e, NotReady):
+        print(f"[ERROR] {request_id()} {status} {type(e).__name__}: {e}")
+    if status == 500:
+        print(traceback.format_exc())
+    return HTTPException(status_code=status, detail=f"{message} (request id {request_id()})", headers=headers)
+
+# Filled in once per scrape by /metrics, so both session metrics come from one query
+session_stats = {}
+REGISTRY.gauge("salesbot_active_sessions", "Sessions currently stored.",
+               function=lambda: session_stats.get("active_sessions", 0))
+REGISTRY.counter("salesbot_evicted_sessions_total", "Sessions evicted for idleness or capacity.",
+                 function=lambda: session_stats.get("evicted_sessions", 0))
+REGISTRY.gauge("salesbot_answer_cache_entries", "Entries in the semantic answer cache.",
+               function=lambda: answer_cache.stats()["entries"])
+REGISTRY.counter("salesbot_answer_cache_hits_total", "Answer cache lookups that hit.",
+                 function=lambda: answer_cache.stats()["hits"])
+REGISTRY.counter("salesbot_answer_cache_misses_total", "Answer cache lookups that missed.",
+                 function=lambda: answer_cache.stats()["misses"])
+REGISTRY.gauge("salesbot_lead_queue_depth", "Leads waiting to be written.",
+               function=lambda: lead_writer.queue.qsize())
+REGISTRY.counter("salesbot_leads_written_total", "Leads written to the lead store (inserted or merged).",
+                 function=lambda: lead_writer.inserted + lead_writer.merged)
+REGISTRY.counter("salesbot_leads_failed_total", "Leads lost because a batch could not be written.",
+                 function=lambda: lead_writer.failed)
+REGISTRY.gauge("salesbot_process_resident_memory_bytes", "Resident set size of this process.",
+               function=lambda: process_rss_bytes())
+
+@asynccontextmanager
+async def llm_slot():
+    # Time spent queueing for the global LLM semaphore is its own stage
+    with stage("llm_queue"):
+        await llm_semaphore.acquire()
+    try:
+        yield
+    finally:
+        llm_semaphore.release()
 
 @app.post("/ask", response_model=BotResponse)
 async def ask(request: UserQuery):
     try:
         # Track question count
-        if request.session_id not in session_question_counts:
-            session_question_counts[request.session_id] = 0
-        session_question_counts[request.session_id] += 1
+        session = sessions.get(request.session_id)
+        question_count = await sessions.count_question(session)
         
         # Check for quick FAQ match first
-        faq_result = check_quick_faq(request.user_query)
+        faq_answer = faq_response(request.user_query)
+        if faq_answer:
+            record_outcome("faq")
+            return classified(faq_answer, request.intent_score)
         
-        if faq_result["found"]:
-            # Return instant FAQ answer
-            nudge = ""
-            # Add nudge based on FAQ category
-            if faq_result.get("category") == "eligibility":
-                nudge = config.get("nudges", {}).get("application_ready", "")
-            elif faq_result.get("category") == "documents_required":
-                nudge = config.get("nudges", {}).get("document_help", "")
-            elif faq_result.get("category") == "contact":
-                nudge = "Feel free to call us or visit our office!"
-            
-            return BotResponse(
-                bot_response=faq_result["answer"],
-                sources=[faq_result["source"]],
-                is_instant_faq=True,
-                nudge=nudge if nudge else None
-            )
+        await reload_index_if_changed()
         
-        # Get or create chain for this session
-        qa_chain = get_or_create_chain(request.session_id)
-        
-        # Run the query through RAG
-        response = qa_chain.invoke({"question": request.user_query})
-        answer = response.get("answer", "Sorry, I could not generate an answer.")
+        # Run the query through RAG without blocking the event loop. sessions.turn
+        # keeps turns of one session from interleaving in its history; the
+        # semaphore is only taken once it's this session's turn.
+        async with sessions.turn(session):
+            query_vector = await standalone_vector(session, request.user_query)
+            faq_answer = semantic_faq_response(request.user_query, query_vector)
+            if faq_answer:
+                record_outcome("semantic_faq")
+                return classified(faq_answer, request.intent_score)
+            hit = await cached_answer(session, request.user_query, query_vector)
+            if hit:
+                record_outcome("cached")
+                return classified(BotResponse(
+                    bot_response=hit["answer"],
+                    sources=hit["sources"],
+                    is_cached=True,
+                    nudge=rag_nudge(question_count),
+                    intent_score=intent_score(request.user_query, products=hit["products"])
+                ), request.intent_score)
+            if not rag_ready():
+                raise NotReady()
+            async with llm_slot():
+                with retriever_in_use() as retriever:
+                    response = await rag_pipeline.ainvoke(request.user_query, session.history, retriever)
+            answer = response.get("answer") or "Sorry, I could not generate an answer."
+            await add_turn(session, request.user_query, answer)
 
-        sources = ["finance_company_pricing.pdf"] 
-        
-        # Check if we should prompt for lead capture
-        nudge = None
-        if session_question_counts[request.session_id] == 2:
-            nudge = "I notice you have several questions. Would you like to share your contact details so our team can provide personalized assistance?"
+        sources = document_sources(response["source_documents"])
+        products = retrieved_products(response["source_documents"])
+        if ANSWER_CACHE_ENABLED and query_vector is not None:
+            answer_cache.store(request.user_query, query_vector, answer, sources, products)
+        record_outcome("rag")
         
-        return BotResponse(
+        return classified(BotResponse(
             bot_response=answer,
             sources=sources,
-            nudge=nudge
-        )
+            nudge=rag_nudge(question_count),
+            intent_score=intent_score(request.user_query, products=products)
+        ), request.intent_score)
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise http_error(e)
+
+@app.post("/ask/stream")
+async def ask_stream(request: UserQuery):
+    """Server-sent events variant of /ask: `token` events carry answer text as it
+    is generated, a final `done` event carries sources and nudge."""
+    session = sessions.get(request.session_id)
+    question_count = await sessions.count_question(session)
+
+    def done_event(response: BotResponse) -> str:
+        return sse_event("done", classified(response, request.intent_score).model_dump(exclude={"bot_response"}))
+
+    async def events():
+        try:
+            faq_answer = faq_response(request.user_query)
+            if faq_answer:
+                record_outcome("faq")
+                yield sse_event("token", {"text": faq_answer.bot_response})
+                yield done_event(faq_answer)
+                return
+
+            await reload_index_if_changed()
+            answer_parts = []
+            async with sessions.turn(session):
+                query_vector = await standalone_vector(session, request.user_query)
+                faq_answer = semantic_faq_response(request.user_query, query_vector)
+                if faq_answer:
+                    record_outcome("semantic_faq")
+                    yield sse_event("token", {"text": faq_answer.bot_response})
+                    yield done_event(faq_answer)
+                    return
+                hit = await cached_answer(session, request.user_query, query_vector)
+                if hit:
+                    record_outcome("cached")
+                    yield sse_event("token", {"text": hit["answer"]})
+                    yield done_event(BotResponse(
+                        bot_response="", sources=hit["sources"], is_cached=True, nudge=rag_nudge(question_count),
+                        intent_score=intent_score(request.user_query, products=hit["products"])))
+                    return
+                if not rag_ready():
+                    raise NotReady()
+                async with llm_slot():
+                    with retriever_in_use() as retriever:
+                        prepared = await rag_pipeline.prepare(request.user_query, session.history, retriever)
+                    async for text in rag_pipeline.astream_answer(prepared):
+                        answer_parts.append(text)
+                        yield sse_event("token", {"text": text})
+                await add_turn(session, request.user_query, "".join(answer_parts))
+
+            sources = document_sources(prepared["source_documents"])
+            products = retrieved_products(prepared["source_documents"])
+            if ANSWER_CACHE_ENABLED and query_vector is not None and answer_parts:
+                answer_cache.store(request.user_query, query_vector, "".join(answer_parts), sources, products)
+            record_outcome("rag")
+            yield done_event(BotResponse(
+                bot_response="",
+                sources=sources,
+                nudge=rag_nudge(question_count),
+                intent_score=intent_score(request.user_query, products=products)
+            ))
+        except Exception as e:
+            # Headers are already sent, so the status travels in the event
+            error = http_error(e)
+            yield sse_event("error", {"detail": error.detail, "status": error.status_code})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/nudge", response_model=NudgeResponse)
+async def nudge(request: NudgeRequest):
+    """Which tabs should show a nudge now, in how many seconds to ask again, and
+    the user type for the page's intent score."""
+    nudges, next_check = nudge_rules.decide(request.tabs, request.seconds_on_page, request.intent_score,
+                                            request.dismissed)
+    return NudgeResponse(nudges=nudges, next_check_seconds=next_check,
+                         user_type=scorer.user_type(request.intent_score),
+                         lead_form=scorer.lead_form_due(request.intent_score))
+
+@app.post("/leads", status_code=202)
+async def submit_lead(lead: LeadSubmission, authorization: Optional[str] = Header(None)):
+    """Queue a lead; it is deduplicated and stored within flush_interval_seconds."""
+    if not lead.name.strip() or not (lead.email.strip() or lead.phone.strip()):
+        raise HTTPException(status_code=422, detail="A name and an email or phone number are required.")
+    data = lead.model_dump()
+    # Without the token a repeat submission only fills in blank fields
+    data["overwrite"] = bool(LEADS_API_TOKEN) and leads_token_valid(authorization)
+    if lead.session_id:
+        # The backend's count includes questions the page may not know about
+        data["questions_asked"] = max(lead.questions_asked, await sessions.question_count(lead.session_id))
+    try:
+        lead_writer.submit(data)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many leads queued, please retry.",
+                            headers={"Retry-After": "1"})
+    return {"status": "queued"}
+
+def leads_token_valid(authorization: Optional[str]) -> bool:
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(token.strip().encode("utf-8"),
+                                                                 LEADS_API_TOKEN.encode("utf-8"))
+
+def require_leads_token(authorization: Optional[str] = Header(None)):
+    # Closed unless a token is configured
+    if not LEADS_API_TOKEN:
+        raise HTTPException(status_code=503, detail="Listing leads is disabled: LEADS_API_TOKEN is not set.")
+    if not leads_token_valid(authorization):
+        raise HTTPException(status_code=401, detail="A valid bearer token is required.",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+@app.get("/leads", response_model=LeadPage, dependencies=[Depends(require_leads_token)])
+async def list_leads(user_type: Optional[Literal[LEAD_TYPES]] = None, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, limit: int = Query(50, ge=1, le=500),
+                     cursor: Optional[str] = None):
+    """Stored leads, newest first, by type and capture time; page with `next_cursor`."""
+    try:
+        position = parse_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    leads, next_cursor = await asyncio.to_thread(
+        lead_store.query, user_type, since.timestamp() if since else None,
+        until.timestamp() if until else None, limit, position)
+    return LeadPage(leads=leads, next_cursor=next_cursor)
+
+@app.post("/score/batch", response_model=ScoreBatchResponse)
+async def score_batch(request: ScoreBatchRequest):
+    """Re-score stored conversations from their questions and page events, with
+    the configured weights or trial overrides of sections of "scoring"."""
+    batch_scorer = scorer
+    if request.scoring:
+        merged = {section: {**scoring_config.get(section, {}), **values} for section, values in request.scoring.items()}
+        batch_scorer = IntentScorer({**scoring_config, **merged})
+    conversations = [([question.model_dump() for question in conversation.questions], conversation.events)
+                     for conversation in request.conversations]
+    scores, user_types = await asyncio.to_thread(batch_scorer.score_batch, conversations)
+    return ScoreBatchResponse(scores=[
+        ConversationScore(id=conversation.id, intent_score=score, user_type=user_type)
+        for conversation, score, user_type in zip(request.conversations, scores.tolist(), user_types)
+    ])
+
+@app.get("/stats")
+async def stats():
+    return {
+        "answer_cache": answer_cache.stats(),
+        "sessions": await sessions.stats(),
+        "leads": {"queued": lead_writer.queue.qsize(), "inserted": lead_writer.inserted,
+                  "merged": lead_writer.merged, "failed": lead_writer.failed},
+        "process_rss_bytes": process_rss_bytes(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: per-stage latency histograms, LLM tokens and
+    in-flight calls, answer outcomes, cache and session gauges."""
+    session_stats.update(await sessions.stats())
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving (quick FAQs work from the start)."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once RAG answers can be served, 503 while warming up or if loading the index failed."""
+    ready = rag_ready()
+    body = {"status": "ready" if ready else "warming", **startup_state}
+    if startup_state["index"] == "failed":
+        body["status"] = "failed"
+    return JSONResponse(body, status_code=200 if ready else 503)
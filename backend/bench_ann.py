@@ -0,0 +1,109 @@
+"""Recall@k vs. latency report for the vector index types in index_store.py.
+
+Builds every index type with build_index (as ingest.py does) over either the
+vectors stored in an existing index (--index) or a synthetic clustered corpus
+(--synthetic N), answers --queries queries one at a time and compares the hits
+with an exact flat search. Sweeps nprobe (IVF) and ef_search (HNSW), so the
+output shows which setting reaches the recall you need at what latency for a
+given corpus size. Other settings come from `vector_index` in config.json.
+Run from the backend directory:
+
+    python bench_ann.py [--synthetic 200000] [--index faiss_index_pricing] [--k 3] [--queries 500]
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from config import config
+from embeddings import EMBEDDING_DIMENSIONS
+from index_store import INDEX_TYPES, IndexStore, apply_search_settings, build_index, effective_type, index_settings
+
+NPROBE_SWEEP = (1, 4, 16, 64, 256)
+EF_SEARCH_SWEEP = (16, 32, 64, 128, 256)
+
+
+def synthetic_corpus(n, dimensions, clusters=512, seed=0):
+    # Embeddings of a document corpus are far from uniform; a mixture of
+    # Gaussians is a closer (and harder for IVF) stand-in
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=n)] + 0.5 * rng.normal(size=(n, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def make_queries(vectors, count, seed=1):
+    # Perturbed corpus vectors: each query has near neighbours, like a real question
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(len(vectors), size=count)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    return queries.astype(np.float32)
+
+
+def run(index, queries, truth, k):
+    latencies = []
+    found = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found += len(set(ids[0].tolist()) & set(expected.tolist()))
+    latencies = np.array(latencies) * 1000
+    return found / truth.size, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=100_000, help="number of synthetic vectors")
+    parser.add_argument("--index", help="benchmark the vectors stored in this index instead")
+    parser.add_argument("--k", type=int, default=index_settings(config.get("vector_index"))["k"])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads (1 = per-request latency)")
+    args = parser.parse_args()
+    faiss.omp_set_num_threads(args.threads)
+
+    if args.index:
+        store = IndexStore.open(args.index)
+        ids, vectors = store.stored_vectors()
+        store.close()
+    else:
+        vectors = synthetic_corpus(args.synthetic, EMBEDDING_DIMENSIONS)
+        ids = np.arange(len(vectors), dtype=np.int64)
+    queries = make_queries(vectors, args.queries)
+    n, dimensions = vectors.shape
+
+    base = index_settings(config.get("vector_index"))
+    exact = build_index(vectors, ids, dict(base, type="flat"))
+    _, truth = exact.search(queries, args.k)
+    print(f"{n} vectors x {dimensions} dims, {args.queries} queries, recall@{args.k} against exact search, "
+          f"{args.threads} thread(s)")
+    print(f"{'index':<16} {'setting':<14} {'build s':>8} {'size MB':>8} {f'recall@{args.k}':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")
+
+    for kind in INDEX_TYPES:
+        settings = dict(base, type=kind)
+        actual, nlist = effective_type(settings, n)
+        start = time.perf_counter()
+        index = build_index(vectors, ids, settings)
+        build_seconds = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+        label = kind if actual == kind else f"{kind}->{actual}"
+        if actual in ("ivf_flat", "ivf_pq"):
+            sweep = [("nprobe", value) for value in NPROBE_SWEEP if value <= nlist]
+        elif actual == "hnsw":
+            sweep = [("ef_search", value) for value in EF_SEARCH_SWEEP]
+        else:
+            sweep = [(None, None)]
+        for key, value in sweep:
+            if key:
+                apply_search_settings(index, dict(settings, **{key: value}))
+            recall, p50, p95 = run(index, queries, truth, args.k)
+            setting = f"{key}={value}" if key else "-"
+            print(f"{label:<16} {setting:<14} {build_seconds:>8.2f} {size_mb:>8.1f} {recall:>9.3f} "
+                  f"{p50:>8.3f} {p95:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
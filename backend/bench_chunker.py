@@ -0,0 +1,75 @@
+"""Benchmark the token chunker against the old word-count RecursiveCharacterTextSplitter.
+
+Splits every page of finance_company_pricing.pdf (or --pdf) --repeat times with
+the old word-count splitter, the same splitter measuring tiktoken tokens (what
+a token-aware RecursiveCharacterTextSplitter would cost) and TokenChunker, and
+reports time per page, chunk counts and length-function calls. --pages-from-pdf
+N concatenates N copies of the text into one long page to show scaling. Run
+from the backend directory:
+
+    python bench_chunker.py [--repeat 50] [--pdf documents/other.pdf] [--pages-from-pdf 50]
+"""
+import argparse
+import os
+import time
+
+import fitz  # PyMuPDF
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from knowledge_base import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, FILENAME
+from chunking import TokenChunker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", default=FILENAME)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--pages-from-pdf", type=int, default=1)
+    args = parser.parse_args()
+    if not os.path.exists(args.pdf):
+        args.pdf = os.path.join(os.path.dirname(os.path.abspath(__file__)), "documents", "finance_company_pricing.pdf")
+
+    with fitz.open(args.pdf) as pdf:
+        pages = [Document(page_content=page.get_text(), metadata={"page": i}) for i, page in enumerate(pdf)]
+    if args.pages_from_pdf > 1:
+        text = "\n".join(page.page_content for page in pages)
+        pages = [Document(page_content="\n".join([text] * args.pages_from_pdf), metadata={"page": 0})]
+
+    new = TokenChunker(chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS)
+    length_calls = {}
+
+    def counted(label, fn):
+        def length_function(text):
+            length_calls[label] = length_calls.get(label, 0) + 1
+            return fn(text)
+        return length_function
+
+    splitters = {
+        # The splitter this repo used before TokenChunker
+        "Recursive, word count": RecursiveCharacterTextSplitter(
+            chunk_size=500, chunk_overlap=200,
+            length_function=counted("Recursive, word count", lambda text: len(text.split()))),
+        "Recursive, tiktoken length": RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS,
+            length_function=counted("Recursive, tiktoken length",
+                                    lambda text: len(new.encoding.encode_ordinary(text)))),
+        "TokenChunker": new,
+    }
+
+    print(f"{args.pdf}: {len(pages)} pages, {sum(len(p.page_content) for p in pages)} chars")
+    print(f"{'splitter':<28} {'ms/page':>9} {'chunks':>7} {'length calls/page':>18}")
+    runs = args.repeat * len(pages)
+    for label, splitter in splitters.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            chunks = splitter.split_documents(pages)
+        per_page = (time.perf_counter() - start) / runs
+        calls = length_calls.get(label, 0) / runs
+        print(f"{label:<28} {per_page * 1000:>9.3f} {len(chunks):>7} {calls:>18.0f}")
+    token_counts = [chunk.metadata["token_count"] for chunk in new.split_documents(pages)]
+    print(f"TokenChunker token_count per chunk: {token_counts[:20]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Micro-benchmark for FAQ keyword matching.
+
+Compares the old nested substring scan with the compiled FAQMatcher while the
+number of FAQ keywords grows. Run from the backend directory:
+
+    python bench_faq.py
+"""
+import json
+import os
+import random
+import timeit
+
+from faq_matcher import FAQMatcher
+
+QUERIES = [
+    "what is the interest rate on a home loan",
+    "how long does processing take for a personal loan",
+    "which documents do I need to submit",
+    "can I recall my application after I applied",
+    "sometimes I wonder if I am eligible for a car loan",
+]
+
+
+def legacy_check(quick_faqs, user_question):
+    user_question = user_question.lower()
+    for faq_name, faq_data in quick_faqs.items():
+        for keyword in faq_data.get("keywords", []):
+            if keyword in user_question:
+                return faq_name
+    return None
+
+
+def synthetic_faqs(base, n_keywords, keywords_per_faq=20):
+    rng = random.Random(n_keywords)
+    faqs = {}
+    for i in range(n_keywords // keywords_per_faq):
+        faqs[f"synthetic_{i}"] = {
+            "keywords": [
+                "".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(rng.randint(5, 9)))
+                for _ in range(keywords_per_faq)
+            ],
+            "answer": "",
+            "source": "",
+        }
+    # Real FAQs go last so the legacy scan has to walk past the synthetic ones
+    faqs.update(base)
+    return faqs
+
+
+def main():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")) as f:
+        base = json.load(f).get("quick_faqs", {})
+
+    print(f"{'keywords':>9} {'legacy us/query':>16} {'compiled us/query':>18}")
+    for n_keywords in (0, 100, 1000, 5000, 20000):
+        faqs = synthetic_faqs(base, n_keywords)
+        matcher = FAQMatcher(faqs)
+        total = sum(len(faq.get("keywords", [])) for faq in faqs.values())
+        number = 200
+
+        legacy = timeit.timeit(lambda: [legacy_check(faqs, q) for q in QUERIES], number=number)
+        compiled = timeit.timeit(lambda: [matcher.match(q) for q in QUERIES], number=number)
+        per_query = number * len(QUERIES) / 1e6
+        print(f"{total:>9} {legacy / per_query:>16.1f} {compiled / per_query:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Throughput benchmark for PDF parsing + chunking, in pages/sec.
+
+Compares the PyPDFLoader + splitting_text path with the PyMuPDF process-pool
+loader (DocumentLoader.iter_pdf_chunks) on a synthetic rate-card PDF, or on
+the PDF given with --pdf. Run from the backend directory:
+
+    python bench_pdf_loader.py [--pages 400] [--workers 4] [--pdf some.pdf]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from knowledge_base import DocumentLoader
+
+PRODUCTS = ["Home Loan", "Personal Loan", "Car Loan", "Business Loan", "Gold Loan", "Education Loan"]
+
+
+def make_rate_card(path, pages):
+    rng = random.Random(0)
+    pdf = fitz.open()
+    for page_no in range(pages):
+        page = pdf.new_page()
+        lines = [f"Rate card - page {page_no + 1}"]
+        for _ in range(45):
+            product = rng.choice(PRODUCTS)
+            lines.append(f"{product}: interest {rng.uniform(8, 16):.2f}% p.a., processing fee "
+                         f"{rng.uniform(0.5, 2):.1f}%, tenure up to {rng.randint(1, 30)} years, "
+                         f"EMI from Rs {rng.randint(800, 9000)} per lakh.")
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), "\n".join(lines), fontsize=7)
+    pdf.save(path)
+    pdf.close()
+
+
+def timed(label, pages, fn):
+    start = time.perf_counter()
+    chunks = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {pages / elapsed:>10.1f} pages/s  {len(chunks):>6} chunks  {elapsed:>6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--pdf")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.pdf
+        if path is None:
+            path = os.path.join(tmp, "rate_card.pdf")
+            make_rate_card(path, args.pages)
+        with fitz.open(path) as pdf:
+            pages = pdf.page_count
+        print(f"{path}: {pages} pages")
+
+        legacy = DocumentLoader()
+        timed("PyPDFLoader + splitting_text", pages, lambda: legacy.splitting_text(legacy.pdf_loader(path)))
+        with DocumentLoader(workers=1) as loader:
+            timed("PyMuPDF, 1 worker", pages, lambda: list(loader.iter_pdf_chunks(path)))
+        with DocumentLoader(workers=args.workers) as loader:
+            timed(f"PyMuPDF, {args.workers} workers", pages, lambda: list(loader.iter_pdf_chunks(path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare RAG answer modes on latency and LLM call count, without API credits.
+
+Uses a fake chat model with log-normal latency and fake embeddings over a tiny
+in-memory FAISS index, replays a few multi-turn conversations through
+RAGPipeline in every mode and reports p50/p95 turn latency and LLM calls per
+turn. Run from the backend directory:
+
+    python bench_rag_modes.py [--median-ms 400] [--rounds 20]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+from rag import ANSWER_MODES, RAGPipeline
+
+CONVERSATIONS = [
+    ["What is the interest rate on a home loan?", "And what is the maximum tenure?", "Can I prepay it?"],
+    ["Tell me about personal loans", "What documents do I need for that?", "How fast is disbursal?"],
+    ["Do you offer car loans?", "What about the processing fee?", "Is there a prepayment penalty on those?"],
+]
+
+PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant for a finance company."),
+    ("human", "Chat History:\n{chat_history}\n\nContext from documents:\n{context}\n\nCurrent Question: {question}"),
+])
+
+
+class LatencyChatModel(FakeListChatModel):
+    median_seconds: float = 0.4
+    sigma: float = 0.35
+
+    async def _agenerate(self, *args, **kwargs):
+        await asyncio.sleep(random.lognormvariate(0, self.sigma) * self.median_seconds)
+        return await super()._agenerate(*args, **kwargs)
+
+
+class CallCounter(AsyncCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    async def on_chat_model_start(self, *args, **kwargs):
+        self.calls += 1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def run_mode(mode, llm, retriever, rounds):
+    counter = CallCounter()
+    pipeline = RAGPipeline(llm.with_config(callbacks=[counter]), retriever, PROMPT, mode=mode)
+    latencies = {"first": [], "follow_up": []}
+    calls = {"first": [], "follow_up": []}
+    for _ in range(rounds):
+        for conversation in CONVERSATIONS:
+            history = []
+            for question in conversation:
+                kind = "follow_up" if history else "first"
+                before = counter.calls
+                start = time.perf_counter()
+                result = await pipeline.ainvoke(question, history)
+                latencies[kind].append(time.perf_counter() - start)
+                calls[kind].append(counter.calls - before)
+                history.append((question, result["answer"]))
+    return latencies, calls
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--median-ms", type=float, default=400)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    embeddings = DeterministicFakeEmbedding(size=300)
+    retriever = FAISS.from_texts(
+        ["Home loans from 8.5% p.a., tenure up to 30 years.",
+         "Personal loans up to 40 lakhs from 10.5% p.a.",
+         "Car loans from 9% p.a. with 100% on-road funding.",
+         "Business loans up to 50 lakhs from 12% p.a."],
+        embeddings,
+    ).as_retriever(search_kwargs={"k": 3})
+    llm = LatencyChatModel(responses=["Here is what our rate card says."], median_seconds=args.median_ms / 1000)
+
+    print(f"{'mode':<12} {'turn':<10} {'p50 ms':>8} {'p95 ms':>8} {'LLM calls/turn':>15}")
+    for mode in ANSWER_MODES:
+        latencies, calls = await run_mode(mode, llm, retriever, args.rounds)
+        for kind in ("first", "follow_up"):
+            print(f"{mode:<12} {kind:<10} {percentile(latencies[kind], 0.5) * 1000:>8.0f} "
+                  f"{percentile(latencies[kind], 0.95) * 1000:>8.0f} {statistics.mean(calls[kind]):>15.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
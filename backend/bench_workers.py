@@ -0,0 +1,116 @@
+"""Throughput of the API against the number of uvicorn worker processes.
+
+For each count in --workers, starts `uvicorn app:app --workers N` with the
+offline fake LLM and embeddings and the SQLite session store, so every turn
+of a conversation sees its history whichever worker serves it, then drives
+it with loadtest.py's virtual users for --duration seconds. The report gives
+requests per second, p50/p95 latency and the speed-up over one worker
+(extrapolated from the first row), and checks that the shared store counted
+every question once.
+
+Each worker has its own LLM semaphore and its own core to spend on routing,
+retrieval and serialisation, so throughput should grow linearly with the
+worker count up to the number of cores (and --users must be large enough to
+keep all workers busy). Run from the backend directory:
+
+    python bench_workers.py [--workers 1,2,4] [--users 64] [--duration 20]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+import loadtest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_all_ready(url, workers, timeout):
+    """Poll /readyz over fresh connections until enough consecutive answers say
+    ready that every worker is likely to have been asked."""
+    deadline = time.perf_counter() + timeout
+    streak = 0
+    while streak < 5 * workers:
+        if time.perf_counter() > deadline:
+            raise SystemExit(f"Workers did not become ready within {timeout:.0f}s")
+        try:
+            ready = httpx.get(f"{url}/readyz", timeout=5).status_code == 200
+        except httpx.HTTPError:
+            ready = False
+        streak = streak + 1 if ready else 0
+        if not ready:
+            time.sleep(0.2)
+
+
+def bench(workers, args, env):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sessions.sqlite3")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--workers", str(workers),
+             "--log-level", "warning"],
+            # The app logs every slow request to stdout; keep the report readable
+            cwd=BASE_DIR, env=dict(env, SESSION_DB_PATH=db_path), stdout=subprocess.DEVNULL)
+        try:
+            wait_until_all_ready(url, workers, args.ready_timeout)
+            load_args = argparse.Namespace(url=url, users=args.users, duration=args.duration, mix=args.mix,
+                                           stream=False, timeout=args.timeout, ready_timeout=args.ready_timeout,
+                                           seed=args.seed)
+            results, elapsed = asyncio.run(loadtest.run(load_args))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        with sqlite3.connect(db_path) as conn:
+            (counted,) = conn.execute("SELECT COALESCE(SUM(question_count), 0) FROM sessions").fetchone()
+    return results, elapsed, counted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--mix", default="faq=3,rag=4,multi=3", help="scenario weights (see loadtest.py)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--ready-timeout", type=float, default=600, help="seconds to wait for /readyz")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    env = dict(os.environ, LLM_PROVIDER="fake", EMBEDDINGS_PROVIDER="fake", SESSION_BACKEND="sqlite",
+               KNOWLEDGE_INDEX_PATH=os.path.join(BASE_DIR, "faiss_index_loadtest"))
+    # Build the index once up front rather than in every worker at the same time
+    subprocess.run([sys.executable, "ingest.py"], cwd=BASE_DIR, env=env, check=True)
+
+    print(f"{args.users} users, {args.duration:.0f}s per run, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'requests':>8} {'req/s':>7} {'speed-up':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'errors':>6} {'counted':>8}")
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        results, elapsed, counted = bench(workers, args, env)
+        total = results.total()
+        throughput = total / elapsed
+        baseline = baseline or throughput / workers
+        ms = np.concatenate([np.array(values) for values in results.latencies.values()]) * 1000 if total else [0]
+        errors = sum(results.errors.values())
+        # Every request that reached the app counted one question in the shared store
+        print(f"{workers:>7} {total:>8} {throughput:>7.1f} {throughput / baseline:>7.2f}x "
+              f"{np.percentile(ms, 50):>8.1f} {np.percentile(ms, 95):>8.1f} {errors:>6} {counted:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import math
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import tiktoken
+from langchain_core.documents import Document
+
+# A chunk may end after a token whose text ends with one of these, strongest first
+LINE_BREAKS = (b"\n",)
+SENTENCE_BREAKS = (b".", b"!", b"?", b";", b":")
+
+# Local stand-in when the tiktoken encoding can't be loaded (it is downloaded
+# on first use): one token per UTF-8 byte, about this many per cl100k token
+BYTE_ENCODING = "bytes"
+BYTES_PER_TOKEN = 4
+
+
+def byte_encoding() -> tiktoken.Encoding:
+    return tiktoken.Encoding(BYTE_ENCODING, pat_str=r"\S+|\s+",
+                             mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={})
+
+
+@lru_cache(maxsize=None)
+def load_encoding(name: str) -> Tuple[tiktoken.Encoding, int]:
+    """The named encoding and its tokens per LLM token; falls back to bytes offline."""
+    if name == BYTE_ENCODING:
+        return byte_encoding(), BYTES_PER_TOKEN
+    try:
+        return tiktoken.get_encoding(name), 1
+    except Exception as e:
+        print(f"[ERROR] Could not load the {name} encoding ({type(e).__name__}: {e}); "
+              f"chunking by UTF-8 bytes, {BYTES_PER_TOKEN} per token")
+        return byte_encoding(), BYTES_PER_TOKEN
+
+
+class TokenChunker:
+    """Token-based splitter that tokenises each page exactly once.
+
+    Every distinct token id is classified once as a line break, sentence end
+    or neither; two prefix-maximum arrays then give the nearest boundary at or
+    before any position, so each chunk ends at the last line break (else
+    sentence end) in the second half of its window in O(1) and splitting is
+    linear in the page length. Chunks carry their exact token count (as
+    tokenised within the page) in `metadata["token_count"]`; with the byte
+    fallback, sizes and counts are in bytes / BYTES_PER_TOKEN.
+    """
+
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 100,
+                 encoding_name: str = "cl100k_base", encoding: Optional[tiktoken.Encoding] = None):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.encoding, self.units_per_token = (encoding, 1) if encoding else load_encoding(encoding_name)
+        # In encoding units
+        self.chunk_size = chunk_size * self.units_per_token
+        self.chunk_overlap = chunk_overlap * self.units_per_token
+
+    def _boundaries(self, tokens: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # prev_line[i] / prev_sentence[i] / prev_char[i]: largest j <= i such that
+        # a chunk may end just before token j (-1 if none)
+        unique, inverse = np.unique(tokens, return_inverse=True)
+        kinds = np.zeros(len(unique), dtype=np.int8)
+        # Tokens that start inside a multi-byte character (UTF-8 continuation byte)
+        continues = np.zeros(len(unique), dtype=bool)
+        for i, token in enumerate(unique.tolist()):
+            token_bytes = self.encoding.decode_single_token_bytes(token)
+            continues[i] = bool(token_bytes) and token_bytes[0] & 0xC0 == 0x80
+            text = token_bytes.rstrip(b" \t")
+            if text.endswith(LINE_BREAKS):
+                kinds[i] = 2
+            elif text.endswith(SENTENCE_BREAKS):
+                kinds[i] = 1
+        # Kind of the token *before* each position
+        before = np.zeros(len(tokens), dtype=np.int8)
+        before[1:] = kinds[inverse][:-1]
+        positions = np.arange(len(tokens))
+        prev_line = np.maximum.accumulate(np.where(before == 2, positions, -1))
+        prev_sentence = np.maximum.accumulate(np.where(before >= 1, positions, -1))
+        prev_char = np.maximum.accumulate(np.where(continues[inverse], -1, positions))
+        return prev_line, prev_sentence, prev_char
+
+    def split_text(self, text: str) -> List[Tuple[str, int, int]]:
+        """Split text into (chunk_text, token_start, token_count) tuples."""
+        tokens = self.encoding.encode_ordinary(text)
+        n = len(tokens)
+        if not n:
+            return []
+        prev_line, prev_sentence, prev_char = self._boundaries(np.asarray(tokens))
+
+        chunks = []
+        start = 0
+        while start < n:
+            end = min(start + self.chunk_size, n)
+            if end < n:
+                # Prefer a line break, then a sentence end, in the window's second half
+                floor = start + self.chunk_size // 2
+                if prev_line[end] > floor:
+                    end = int(prev_line[end])
+                elif prev_sentence[end] > floor:
+                    end = int(prev_sentence[end])
+                elif prev_char[end] > start:
+                    # No break to end at: at least don't cut a character in two
+                    end = int(prev_char[end])
+            # A character spanning a whole window or overlap can still be cut; drop its pieces
+            chunk_text = self.encoding.decode_bytes(tokens[start:end]).decode("utf-8", errors="ignore")
+            if chunk_text.strip():
+                chunks.append((chunk_text, start // self.units_per_token,
+                               math.ceil((end - start) / self.units_per_token)))
+            if end >= n:
+                break
+            # The next chunk starts on a character too, as long as that still moves forward
+            start = max(int(prev_char[end - self.chunk_overlap]), start + 1)
+        return chunks
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        chunks = []
+        for document in documents:
+            for chunk_text, token_start, token_count in self.split_text(document.page_content):
+                metadata = dict(document.metadata, token_start=token_start, token_count=token_count)
+                chunks.append(Document(page_content=chunk_text, metadata=metadata))
+        return chunks
@@ -1,4 +1,5 @@
 import json
+from faq_matcher import FAQMatcher
 
 FIlEPATH = "/home/ayush/Projects_1/sales-bot/sales-bot-prediction/backend/config.json"
 
@@ -13,21 +14,24 @@ def load_config():
 
 config = load_config()
 
+# Keywords are compiled once at load time; see FAQMatcher for tie-breaking
+faq_matcher = FAQMatcher(config.get("quick_faqs", {}))
+
 def check_quick_faq(user_question):
     """Check if question matches any FAQ keyword"""
-    user_question = user_question.lower()
-    
-    for faq_name, faq_data in config.get("quick_faqs", {}).items():
-        keywords = faq_data.get("keywords", [])
-        
-        # Check if any keyword matches
-        for keyword in keywords:
-            if keyword in user_question:
-                return {
-                    "found": True,
-                    "answer": faq_data["answer"],
-                    "source": faq_data["source"],
-                    "category": faq_name
-                }
-    
-    return {"found": False}
+    match = faq_matcher.match(user_question)
+    if match is None:
+        return {"found": False}
+
+    faq_name, score = match
+    return quick_faq_result(faq_name, score)
+
+def quick_faq_result(faq_name, score):
+    faq_data = faq_matcher.faqs[faq_name]
+    return {
+        "found": True,
+        "answer": faq_data["answer"],
+        "source": faq_data["source"],
+        "category": faq_name,
+        "score": score
+    }
@@ -0,0 +1,80 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.stores import BaseStore
+
+SQLITE_MAX_VARS = 500  # stay well below SQLITE_MAX_VARIABLE_NUMBER
+
+
+class EmbeddingStore(BaseStore[str, List[float]]):
+    """Persistent embedding cache in a single SQLite file.
+
+    Keys are the texts being embedded; rows are addressed by
+    sha256(namespace + text) so the same chunk or question is only ever sent
+    to the embedding API once per model/dimension namespace. Vectors are kept
+    as raw float32 blobs, next to the text and namespace for `yield_keys`.
+    Safe to share between threads and processes (WAL).
+    """
+
+    def __init__(self, path: str, namespace: str = ""):
+        self.path = path
+        self.namespace = namespace
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    hash TEXT PRIMARY KEY, vector BLOB NOT NULL, key TEXT, namespace TEXT)
+            """)
+            # Caches from before keys were stored; their old rows can't be listed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+            for column in ("key", "namespace"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE embeddings ADD COLUMN {column} TEXT")
+            self._local.conn = conn
+        return conn
+
+    def _hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        hashes = [self._hash(key) for key in keys]
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(hashes), SQLITE_MAX_VARS):
+            batch = hashes[i:i + SQLITE_MAX_VARS]
+            placeholders = ",".join("?" * len(batch))
+            for row_hash, blob in conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({placeholders})", batch):
+                found[row_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return [found.get(h) for h in hashes]
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, List[float]]]) -> None:
+        rows = [(self._hash(key), np.asarray(vector, dtype=np.float32).tobytes(), key, self.namespace)
+                for key, vector in key_value_pairs]
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (hash, vector, key, namespace) VALUES (?, ?, ?, ?)",
+                             rows)
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.executemany("DELETE FROM embeddings WHERE hash = ?", [(self._hash(key),) for key in keys])
+
+    def yield_keys(self, *, prefix: Optional[str] = None) -> Iterator[str]:
+        sql = "SELECT key FROM embeddings WHERE namespace = ? AND key IS NOT NULL"
+        params = [self.namespace]
+        if prefix:
+            sql += " AND substr(key, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        for (key,) in self._conn().execute(sql, params):
+            yield key
@@ -1,19 +1,21 @@
 # vectorstore_builder.py
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from knowledge_base import load_and_split_pdf
+from langchain.embeddings import CacheBackedEmbeddings
+from embedding_store import EmbeddingStore
+from providers import embeddings_namespace, make_embeddings
 import os
 
-def create_faiss_index(pdf_path, index_path="faiss_index_pricing"):
-    
-    texts = load_and_split_pdf(pdf_path)
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_DIMENSIONS = 300
+EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache.sqlite3")
+EMBEDDING_NAMESPACE = embeddings_namespace(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large", dimensions=300)
-
-    vectorstore = FAISS.from_documents(texts, embeddings)
-
-    os.makedirs(index_path, exist_ok=True)
-    vectorstore.save_local(index_path)
-    print(f"[INFO] FAISS index saved to {index_path}")
-
-    return vectorstore, embeddings
+def get_embeddings():
+    # Document chunks and user questions share one persistent cache, so a
+    # rebuild only embeds changed chunks and a repeated question is embedded once
+    store = EmbeddingStore(EMBEDDING_CACHE_PATH, namespace=EMBEDDING_NAMESPACE)
+    return CacheBackedEmbeddings(
+        make_embeddings(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS),
+        store,
+        batch_size=64,
+        query_embedding_store=store,
+    )
@@ -0,0 +1,156 @@
+"""Deterministic offline stand-ins for the OpenAI chat model and embeddings.
+
+Selected through providers.py (`"providers"` in config.json, or the
+LLM_PROVIDER / EMBEDDINGS_PROVIDER environment variables) to run and
+load-test the API without spending credits. Both sleep for a log-normal
+latency, so queueing behaves like it does against the real API.
+"""
+import asyncio
+import hashlib
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import lexical
+
+CANNED_ANSWERS = [
+    "Our home loans start at 8.5% p.a. for tenures of up to 30 years, with a processing fee of 0.5% of the "
+    "loan amount. You can prepay without any penalty on floating-rate loans.",
+    "Personal loans are available from 10.99% p.a. for amounts up to ₹40 Lakhs and tenures of 12 to 60 "
+    "months. Approval usually takes 24 hours once your documents are verified.",
+    "Business loans go up to ₹5 Crores at rates from 14% p.a. We need two years of ITRs, GST returns and "
+    "bank statements for the last twelve months.",
+    "Car loans cover up to 90% of the on-road price at 9.25% p.a. The EMI for ₹5 Lakhs over five years "
+    "is about ₹10,400 per month.",
+]
+
+
+def lognormal_seconds(median_ms: float, sigma: float) -> float:
+    return random.lognormvariate(0, sigma) * median_ms / 1000 if median_ms > 0 else 0.0
+
+
+class HashEmbeddings(Embeddings):
+    """Signed feature hashing of lexical tokens into `size` dimensions.
+
+    Deterministic and free, and unlike random vectors, texts that share words
+    get similar vectors, so answer caching, FAQ routing and retrieval still
+    behave plausibly.
+    """
+
+    def __init__(self, size: int = 300, median_ms: float = 0.0, sigma: float = 0.3):
+        self.size = size
+        self.median_ms = median_ms
+        self.sigma = sigma
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        tokens = lexical.tokenize(text)
+        # Unigrams plus bigrams, so word order matters a little
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.size] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(lognormal_seconds(self.median_ms, self.sigma))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(lognormal_seconds(self.median_ms, self.sigma))
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(lognormal_seconds(self.median_ms, self.sigma))
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(lognormal_seconds(self.median_ms, self.sigma))
+        return self._embed(text)
+
+
+class CannedChatModel(BaseChatModel):
+    """Chat model that answers with a canned text chosen by a hash of the prompt.
+
+    Waits a log-normal time to first token (`median_ms`, `sigma`), then emits
+    one word every 1/`tokens_per_second` seconds.
+    """
+
+    answers: List[str] = CANNED_ANSWERS
+    median_ms: float = 400.0
+    sigma: float = 0.35
+    tokens_per_second: float = 50.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "canned"
+
+    def get_num_tokens(self, text: str) -> int:
+        # Roughly what cl100k gives for English; avoids loading a tokenizer
+        return max(1, len(text) // 4)
+
+    def _answer(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest()
+        text = self.answers[int.from_bytes(digest, "little") % len(self.answers)]
+        words = text.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _usage(self, messages: List[BaseMessage], pieces: List[str]) -> dict:
+        input_tokens = sum(self.get_num_tokens(str(message.content)) for message in messages)
+        return {"input_tokens": input_tokens, "output_tokens": len(pieces),
+                "total_tokens": input_tokens + len(pieces)}
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        pieces = self._answer(messages)
+        time.sleep(lognormal_seconds(self.median_ms, self.sigma) + len(pieces) * self._token_delay())
+        message = AIMessage(content="".join(pieces), usage_metadata=self._usage(messages, pieces))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                         **kwargs: Any) -> ChatResult:
+        pieces = self._answer(messages)
+        await asyncio.sleep(lognormal_seconds(self.median_ms, self.sigma) + len(pieces) * self._token_delay())
+        message = AIMessage(content="".join(pieces), usage_metadata=self._usage(messages, pieces))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(lognormal_seconds(self.median_ms, self.sigma))
+        pieces = self._answer(messages)
+        for i, piece in enumerate(pieces):
+            time.sleep(self._token_delay())
+            # Usage rides on the last chunk, as with OpenAI's stream_usage
+            usage = self._usage(messages, pieces) if i == len(pieces) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(lognormal_seconds(self.median_ms, self.sigma))
+        pieces = self._answer(messages)
+        for i, piece in enumerate(pieces):
+            await asyncio.sleep(self._token_delay())
+            # Usage rides on the last chunk, as with OpenAI's stream_usage
+            usage = self._usage(messages, pieces) if i == len(pieces) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
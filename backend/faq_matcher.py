@@ -0,0 +1,77 @@
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+_END = object()  # trie key marking the end of a phrase
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class PhraseMatcher:
+    """Word-level trie over keyword phrases.
+
+    Matching walks the query tokens once, so the cost depends on the query
+    length (and the longest phrase), not on how many phrases are registered.
+    Phrases only match on whole words: "call" does not fire inside "recall".
+    """
+
+    def __init__(self):
+        self._root: Dict = {}
+        self._max_len = 0
+
+    def add(self, phrase: str, value) -> None:
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_END, []).append(value)
+        self._max_len = max(self._max_len, len(tokens))
+
+    def find(self, text: str) -> Iterator[Tuple[object, int]]:
+        """Yield (value, phrase_length_in_tokens) for every phrase occurrence in text."""
+        tokens = tokenize(text)
+        for start in range(len(tokens)):
+            node = self._root
+            for end in range(start, min(start + self._max_len, len(tokens))):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                for value in node.get(_END, ()):
+                    yield value, end - start + 1
+
+
+class FAQMatcher:
+    """Compiled matcher for the `quick_faqs` section of config.json.
+
+    When several FAQs match, the winner is picked deterministically by:
+    summed token length of the distinct keywords it matched (so "processing
+    time" beats a bare "time"), then the FAQ's optional `priority`, then its
+    position in config.json.
+    """
+
+    def __init__(self, quick_faqs: Dict[str, dict]):
+        self.faqs = quick_faqs
+        self._order = {name: i for i, name in enumerate(quick_faqs)}
+        self._matcher = PhraseMatcher()
+        for faq_name, faq_data in quick_faqs.items():
+            for keyword in faq_data.get("keywords", []):
+                self._matcher.add(keyword, (faq_name, keyword))
+
+    def match(self, user_question: str) -> Optional[Tuple[str, int]]:
+        hits: Dict[str, Dict[str, int]] = {}
+        for (faq_name, keyword), length in self._matcher.find(user_question):
+            hits.setdefault(faq_name, {})[keyword] = length
+        if not hits:
+            return None
+
+        def rank(faq_name):
+            score = sum(hits[faq_name].values())
+            priority = self.faqs[faq_name].get("priority", 0)
+            return (-score, -priority, self._order[faq_name])
+
+        best = min(hits, key=rank)
+        return best, sum(hits[best].values())
@@ -0,0 +1,433 @@
+import asyncio
+import fcntl
+import heapq
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+import lexical
+from tracing import stage
+
+VECTORS_NAME = "vectors.faiss"
+DOCSTORE_NAME = "docstore.sqlite3"
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+DEFAULT_INDEX_SETTINGS = {
+    "type": "flat",
+    "k": 3,
+    "nlist": 1024,          # IVF: number of clusters (capped at corpus size / 39)
+    "nprobe": 16,           # IVF: clusters scanned per query
+    "hnsw_m": 32,           # HNSW: graph degree
+    "ef_construction": 200,
+    "ef_search": 64,        # HNSW: candidate list size per query
+    "pq_m": 30,             # IVF-PQ: sub-quantizers, must divide the embedding dimensions
+    "pq_bits": 8,
+}
+# Settings that change the stored index; the rest are applied when it is opened
+BUILD_KEYS = {
+    "flat": (),
+    "ivf_flat": ("nlist",),
+    "hnsw": ("hnsw_m", "ef_construction"),
+    "ivf_pq": ("nlist", "pq_m", "pq_bits"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,  -- id of the vector in the FAISS index
+    chunk_id TEXT NOT NULL UNIQUE,         -- content hash assigned by ingest.py
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL,                -- JSON
+    vector BLOB NOT NULL,                  -- float32, lets the index be rebuilt without re-embedding
+    length INTEGER NOT NULL                -- number of lexical tokens, for BM25
+);
+-- BM25 inverted index, clustered by term
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_id ON postings (id);
+"""
+
+
+@contextmanager
+def index_lock(path: str):
+    """Serialises updates of the index at `path` across processes (e.g. uvicorn
+    workers that all find it missing at startup)."""
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def fingerprint(path: str):
+    # Changes whenever a new index is swapped in at `path`
+    try:
+        return os.stat(os.path.join(path, VECTORS_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def index_settings(overrides: Optional[dict] = None) -> dict:
+    settings = dict(DEFAULT_INDEX_SETTINGS, **(overrides or {}))
+    if settings["type"] not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type {settings['type']!r}, expected one of {INDEX_TYPES}")
+    return settings
+
+
+def build_settings(settings: dict) -> dict:
+    """The part of `settings` that the stored index was built with."""
+    return {"type": settings["type"], **{key: settings[key] for key in BUILD_KEYS[settings["type"]]}}
+
+
+def effective_type(settings: dict, n: int) -> Tuple[str, int]:
+    # IVF needs ~39 training points per cluster and PQ 2**pq_bits points per
+    # codebook; small corpora fall back to a simpler (exact) index
+    kind = settings["type"]
+    nlist = min(settings["nlist"], n // 39)
+    if kind == "ivf_pq" and n < 2 ** settings["pq_bits"]:
+        kind = "ivf_flat"
+    if kind in ("ivf_flat", "ivf_pq") and nlist < 2:
+        kind = "flat"
+    return kind, nlist
+
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, settings: dict):
+    """Train and fill a FAISS index of the configured type over `vectors`."""
+    n, dimensions = vectors.shape
+    kind, nlist = effective_type(settings, n)
+    if kind != settings["type"]:
+        print(f"[INFO] {n} vectors are too few for {settings['type']}, using a {kind} index")
+    if kind == "flat":
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(dimensions))
+    elif kind == "hnsw":
+        index = faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimensions, settings["hnsw_m"]))
+        faiss.downcast_index(index.index).hnsw.efConstruction = settings["ef_construction"]
+    elif kind == "ivf_flat":
+        index = faiss.index_factory(dimensions, f"IVF{nlist},Flat")
+    else:
+        if dimensions % settings["pq_m"]:
+            raise ValueError(f"pq_m={settings['pq_m']} does not divide the embedding dimensions ({dimensions})")
+        index = faiss.index_factory(dimensions, f"IVF{nlist},PQ{settings['pq_m']}x{settings['pq_bits']}")
+    if n:
+        index.train(vectors)
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def apply_search_settings(index, settings: dict):
+    # Each parameter only exists on some index types
+    params = faiss.ParameterSpace()
+    for name, key in (("nprobe", "nprobe"), ("efSearch", "ef_search")):
+        try:
+            params.set_index_parameter(index, name, settings[key])
+        except RuntimeError:
+            pass
+
+
+class IndexStore:
+    """Pickle-free knowledge index: a FAISS vector index plus a SQLite docstore.
+
+    Serving opens the vector file memory-mapped and read-only, so workers on
+    one host share it through the page cache, and only the rows of the top-k
+    hits are read from SQLite. Updates go through `open_for_update`, which
+    works on a copy in a sibling directory, and `commit`, which makes the
+    index path a symlink to it. A flat
+    index is updated in place; approximate ones (see DEFAULT_INDEX_SETTINGS)
+    are retrained from the vectors kept in the docstore on commit.
+
+    A serving store that has been replaced by a newer one is `retire`d: it is
+    closed as soon as no request holds it through `in_use` any more.
+    """
+
+    def __init__(self, path: str, index, conn: sqlite3.Connection, settings: Optional[dict] = None):
+        self.path = path
+        self.index = index
+        self.settings = index_settings(settings)
+        self._conn = conn
+        self._lock = threading.Lock()  # one connection shared by worker threads
+        self._doc_stats = None
+        self._users = 0
+        self._retired = False
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return all(os.path.exists(os.path.join(path, name)) for name in (VECTORS_NAME, DOCSTORE_NAME))
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True, settings: Optional[dict] = None) -> "IndexStore":
+        # Resolve the symlink once, so both files come from the same version
+        path = os.path.realpath(path)
+        vectors_path = os.path.join(path, VECTORS_NAME)
+        try:
+            index = faiss.read_index(vectors_path, MMAP_FLAGS if mmap else 0)
+        except RuntimeError:
+            # IVF inverted lists cannot be memory-mapped from this format
+            index = faiss.read_index(vectors_path)
+        apply_search_settings(index, index_settings(settings))
+        # The files are never modified in place, so SQLite can skip locking
+        conn = sqlite3.connect(f"file:{os.path.join(path, DOCSTORE_NAME)}?mode=ro&immutable=1",
+                               uri=True, check_same_thread=False)
+        return cls(path, index, conn, settings)
+
+    @classmethod
+    def open_for_update(cls, path: str, dimensions: int, base: Optional[str] = None,
+                        settings: Optional[dict] = None, rebuild: bool = False) -> "IndexStore":
+        """Writable copy of the index at `base` (or an empty index) under `path`.
+
+        With `rebuild`, or for any index type but flat, only the docstore is
+        updated and the vector index is rebuilt from it on commit.
+        """
+        settings = index_settings(settings)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        index = None
+        if base is not None:
+            base = os.path.realpath(base)
+            shutil.copy2(os.path.join(base, DOCSTORE_NAME), os.path.join(path, DOCSTORE_NAME))
+            if settings["type"] == "flat" and not rebuild:
+                index = faiss.read_index(os.path.join(base, VECTORS_NAME))
+        elif settings["type"] == "flat":
+            index = faiss.IndexIDMap2(faiss.IndexFlatL2(dimensions))
+        conn = sqlite3.connect(os.path.join(path, DOCSTORE_NAME), check_same_thread=False)
+        conn.executescript(SCHEMA)
+        return cls(path, index, conn, settings)
+
+    def __len__(self):
+        return self.index.ntotal
+
+    def add(self, chunk_ids: Sequence[str], documents: Sequence[Document], vectors: Sequence[Sequence[float]]):
+        if not chunk_ids:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._conn:
+            row_ids = []
+            for chunk_id, document, vector in zip(chunk_ids, documents, vectors):
+                frequencies, length = lexical.term_frequencies(document.page_content)
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, text, metadata, vector, length) VALUES (?, ?, ?, ?, ?)",
+                    (chunk_id, document.page_content, json.dumps(document.metadata), vector.tobytes(), length))
+                row_ids.append(cursor.lastrowid)
+                self._conn.executemany("INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)",
+                                       [(term, cursor.lastrowid, tf) for term, tf in frequencies.items()])
+        if self.index is not None:
+            self.index.add_with_ids(vectors, np.asarray(row_ids, dtype=np.int64))
+
+    def remove(self, chunk_ids: Sequence[str]):
+        if not chunk_ids:
+            return
+        with self._lock, self._conn:
+            row_ids = [row[0] for chunk_id in chunk_ids for row in self._conn.execute(
+                "SELECT id FROM chunks WHERE chunk_id = ?", (chunk_id,))]
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(row_id,) for row_id in row_ids])
+            self._conn.executemany("DELETE FROM postings WHERE id = ?", [(row_id,) for row_id in row_ids])
+        if row_ids and self.index is not None:
+            self.index.remove_ids(np.asarray(row_ids, dtype=np.int64))
+
+    def commit(self, final_path: str):
+        """Write the vector index and atomically point `final_path` at this copy.
+
+        `final_path` is a symlink to a versioned sibling directory, replaced
+        with os.replace, so readers always find a complete index there. The
+        caller holds `index_lock(final_path)`.
+        """
+        if self.index is None:
+            self.index = self.rebuild()
+        faiss.write_index(self.index, os.path.join(self.path, VECTORS_NAME))
+        self._conn.commit()
+        self._conn.close()
+        version_path = f"{final_path}.v{time.time_ns()}"
+        os.rename(self.path, version_path)
+        self.path = version_path
+        previous = os.path.realpath(final_path) if os.path.islink(final_path) else None
+        if os.path.isdir(final_path) and previous is None:
+            # An index from before versioned directories: move it aside, once
+            previous = f"{final_path}.v0"
+            os.rename(final_path, previous)
+        link = f"{final_path}.link-{os.getpid()}"
+        os.symlink(os.path.basename(version_path), link)
+        os.replace(link, final_path)
+        # Servers still reading the old files keep them open until they reload
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def close(self):
+        self._conn.close()
+        # Drops the memory map of the vector file
+        self.index = None
+
+    @contextmanager
+    def in_use(self):
+        with self._lock:
+            self._users += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._users -= 1
+                idle = self._retired and not self._users
+            if idle:
+                self.close()
+
+    def retire(self):
+        """Close now if idle, else when the last `in_use` block ends."""
+        with self._lock:
+            self._retired = True
+            idle = not self._users
+        if idle:
+            self.close()
+
+    def stored_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All (row ids, vectors) in the docstore."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, vector FROM chunks ORDER BY id").fetchall()
+        ids = np.fromiter((row_id for row_id, _ in rows), dtype=np.int64, count=len(rows))
+        if not rows:
+            return ids, np.zeros((0, 0), dtype=np.float32)
+        return ids, np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+
+    def rebuild(self):
+        ids, vectors = self.stored_vectors()
+        if not len(ids):
+            raise ValueError(f"No chunks left to index in {self.path}")
+        return build_index(vectors, ids, self.settings)
+
+    def fetch(self, row_ids: Sequence[int]) -> List[Document]:
+        """Load the chunks for the given vector ids, in the order given."""
+        if not row_ids:
+            return []
+        placeholders = ",".join("?" * len(row_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", list(row_ids)).fetchall()
+        by_id = {row_id: Document(page_content=text, metadata=json.loads(metadata)) for row_id, text, metadata in rows}
+        return [by_id[row_id] for row_id in row_ids if row_id in by_id]
+
+    def vector_search(self, vector: Sequence[float], k: int) -> List[int]:
+        _, ids = self.index.search(np.asarray([vector], dtype=np.float32), k)
+        return [int(row_id) for row_id in ids[0] if row_id != -1]
+
+    def search(self, vector: Sequence[float], k: int) -> List[Document]:
+        return self.fetch(self.vector_search(vector, k))
+
+    def lexical_search(self, query: str, k: int) -> Tuple[List[Tuple[int, float]], float]:
+        """Top-k (row id, BM25 score) for `query`, plus the best possible score."""
+        terms = list(set(lexical.tokenize(query)))
+        if not terms:
+            return [], 0.0
+        placeholders = ",".join("?" * len(terms))
+        with self._lock:
+            if self._doc_stats is None:
+                # Constant for an opened index, which is never modified in place
+                self._doc_stats = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            rows = self._conn.execute(
+                f"SELECT p.term, p.id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.id "
+                f"WHERE p.term IN ({placeholders})", terms).fetchall()
+        doc_count, avg_length = self._doc_stats
+        postings = {}
+        for term, row_id, tf, length in rows:
+            postings.setdefault(term, []).append((row_id, tf, length))
+        scores, ideal = lexical.bm25(postings, doc_count, avg_length or 1.0, terms)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1]), ideal
+
+
+class IndexStoreRetriever(BaseRetriever):
+    """Retriever over an IndexStore; stands in for `FAISS.as_retriever`."""
+
+    store: Any
+    embeddings: Any
+    k: int = 3
+
+    def _search(self, vector) -> List[Document]:
+        with stage("vector_search"):
+            return self.store.search(vector, self.k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        with stage("embed_query"):
+            vector = self.embeddings.embed_query(query)
+        return self._search(vector)
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        with stage("embed_query"):
+            vector = await self.embeddings.aembed_query(query)
+        return await asyncio.to_thread(self._search, vector)
+
+
+class HybridRetriever(BaseRetriever):
+    """BM25 + vector retrieval over an IndexStore, fused with reciprocal-rank fusion.
+
+    When the best BM25 hit covers most of the query's weight and clearly beats
+    the runner-up, the lexical ranking is returned as is and the question is
+    never embedded.
+    """
+
+    store: Any
+    embeddings: Any
+    k: int = 3
+    candidates: int = 20        # hits taken from each ranking before fusion
+    rrf_k: int = 60
+    fast_path: bool = True
+    fast_path_min_confidence: float = 0.5  # top BM25 score / best possible score
+    fast_path_min_margin: float = 1.5      # top BM25 score / second score
+
+    def lexical_fast_path(self, hits: List[Tuple[int, float]], ideal: float) -> bool:
+        if not self.fast_path or not hits or ideal <= 0:
+            return False
+        top = hits[0][1]
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        return top / ideal >= self.fast_path_min_confidence and top >= self.fast_path_min_margin * runner_up
+
+    def fuse(self, *rankings: List[int]) -> List[int]:
+        scores = {}
+        for ranking in rankings:
+            for rank, row_id in enumerate(ranking):
+                scores[row_id] = scores.get(row_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        return [row_id for row_id, _ in heapq.nlargest(self.k, scores.items(), key=lambda item: item[1])]
+
+    def _lexical_search(self, query: str):
+        with stage("lexical_search"):
+            return self.store.lexical_search(query, self.candidates)
+
+    def _fetch(self, row_ids: List[int]) -> List[Document]:
+        with stage("fetch"):
+            return self.store.fetch(row_ids)
+
+    def _fused_documents(self, lexical_ids: List[int], vector) -> List[Document]:
+        with stage("vector_search"):
+            vector_ids = self.store.vector_search(vector, self.candidates)
+        return self._fetch(self.fuse(lexical_ids, vector_ids))
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        hits, ideal = self._lexical_search(query)
+        lexical_ids = [row_id for row_id, _ in hits]
+        if self.lexical_fast_path(hits, ideal):
+            return self._fetch(lexical_ids[:self.k])
+        with stage("embed_query"):
+            vector = self.embeddings.embed_query(query)
+        return self._fused_documents(lexical_ids, vector)
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        hits, ideal = await asyncio.to_thread(self._lexical_search, query)
+        lexical_ids = [row_id for row_id, _ in hits]
+        if self.lexical_fast_path(hits, ideal):
+            return await asyncio.to_thread(self._fetch, lexical_ids[:self.k])
+        with stage("embed_query"):
+            vector = await self.embeddings.aembed_query(query)
+        return await asyncio.to_thread(self._fused_documents, lexical_ids, vector)
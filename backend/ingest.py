@@ -0,0 +1,183 @@
+"""Incremental ingestion of a directory of documents into the knowledge index.
+
+Tracks a content hash per file and per chunk in `<index>/manifest.json`, so a
+run only embeds chunks that are new, drops chunks of edited or deleted files,
+and leaves everything else untouched. The updated index is written next to the
+live one and swapped in by replacing a symlink, so the API keeps serving the old
+index until the new one is complete. Runs are serialised by a lock file next to
+the index, so several workers starting at once build it only once.
+
+    python ingest.py [--docs documents/] [--index faiss_index_pricing/]
+
+The index is an IndexStore (see index_store.py): FAISS vectors plus a SQLite
+docstore, no pickles. Its type comes from `vector_index` in config.json;
+changing a build setting (type, nlist, hnsw_m, ...) rebuilds it from the stored
+vectors on the next run without re-embedding anything.
+"""
+import argparse
+import hashlib
+import json
+import os
+from typing import Dict, List, Tuple
+
+from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
+
+from config import config
+from embeddings import EMBEDDING_NAMESPACE, get_embeddings
+from index_store import IndexStore, build_settings, index_lock, index_settings
+from knowledge_base import DocumentLoader
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DIR = os.path.join(BASE_DIR, "documents")
+INDEX_PATH = os.getenv("KNOWLEDGE_INDEX_PATH", os.path.join(BASE_DIR, "faiss_index_pricing"))
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2  # 2: docstore carries the BM25 postings
+INDEX_SETTINGS = index_settings(config.get("vector_index"))
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(relpath: str, chunks: List[Document]) -> List[str]:
+    # Content-addressed ids; repeated identical chunks in one file get a counter
+    seen: Dict[str, int] = {}
+    ids = []
+    for chunk in chunks:
+        base = hashlib.sha256(f"{relpath}\0{chunk.page_content}".encode("utf-8")).hexdigest()
+        seen[base] = seen.get(base, 0) + 1
+        ids.append(base if seen[base] == 1 else f"{base}-{seen[base]}")
+    return ids
+
+
+def load_and_split(loader: DocumentLoader, path: str, relpath: str) -> List[Document]:
+    if path.lower().endswith(".pdf"):
+        chunks = list(loader.iter_pdf_chunks(path))
+    else:
+        chunks = loader.splitting_text(TextLoader(path, encoding="utf-8").load())
+    for chunk in chunks:
+        chunk.metadata["source"] = relpath
+    return chunks
+
+
+def scan_documents(docs_dir: str) -> Dict[str, str]:
+    found = {}
+    for root, _, files in os.walk(docs_dir):
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                path = os.path.join(root, name)
+                found[os.path.relpath(path, docs_dir)] = path
+    return found
+
+
+def load_manifest(index_path: str) -> dict:
+    try:
+        with open(os.path.join(index_path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def needs_rebuild(index_path: str, settings: dict = INDEX_SETTINGS) -> bool:
+    """True if the index at `index_path` was built with other build settings or embeddings."""
+    manifest = load_manifest(index_path)
+    return manifest.get("index") != build_settings(settings) or manifest.get("embeddings") != EMBEDDING_NAMESPACE
+
+
+def plan_changes(docs_dir: str, manifest: dict) -> Tuple[dict, List[Document], List[str], List[str]]:
+    """Work out which chunks to add and which chunk ids to remove."""
+    current = scan_documents(docs_dir)
+    files = {}
+    to_add: List[Document] = []
+    add_ids: List[str] = []
+    remove_ids: List[str] = []
+    # One process pool shared by all changed PDFs
+    with DocumentLoader() as loader:
+        for relpath, path in current.items():
+            sha = file_sha256(path)
+            previous = manifest["files"].get(relpath)
+            if previous and previous["sha256"] == sha:
+                files[relpath] = previous
+                continue
+            chunks = load_and_split(loader, path, relpath)
+            ids = chunk_ids(relpath, chunks)
+            old_ids = set(previous["chunks"]) if previous else set()
+            for chunk, chunk_id in zip(chunks, ids):
+                if chunk_id not in old_ids:
+                    to_add.append(chunk)
+                    add_ids.append(chunk_id)
+            remove_ids.extend(old_ids - set(ids))
+            files[relpath] = {"sha256": sha, "chunks": ids}
+
+        for relpath, previous in manifest["files"].items():
+            if relpath not in current:
+                remove_ids.extend(previous["chunks"])
+
+    return {"version": MANIFEST_VERSION, "files": files}, to_add, add_ids, remove_ids
+
+
+def ingest(docs_dir: str = DOCS_DIR, index_path: str = INDEX_PATH, embeddings=None,
+           settings: dict = INDEX_SETTINGS) -> dict:
+    # The lock file and versioned directories are named after the path itself
+    index_path = os.path.normpath(index_path)
+    # Whoever waited for the lock finds the index up to date and commits nothing
+    with index_lock(index_path):
+        return update_index(docs_dir, index_path, embeddings or get_embeddings(), settings)
+
+
+def update_index(docs_dir: str, index_path: str, embeddings, settings: dict) -> dict:
+    manifest = load_manifest(index_path)
+    built_with = build_settings(settings)
+    rebuild = manifest.get("index") != built_with
+    has_index = (bool(manifest["files"]) and IndexStore.exists(index_path)
+                 and manifest.get("embeddings") == EMBEDDING_NAMESPACE)
+    if not has_index:
+        # No manifest, an index in an older format or from other embeddings:
+        # start from scratch, the embedding cache keeps this cheap
+        manifest = {"version": MANIFEST_VERSION, "files": {}}
+
+    new_manifest, to_add, add_ids, remove_ids = plan_changes(docs_dir, manifest)
+    new_manifest["index"] = built_with
+    new_manifest["embeddings"] = EMBEDDING_NAMESPACE
+    summary = {"files": len(new_manifest["files"]), "added": len(add_ids), "removed": len(remove_ids),
+               "index": settings["type"]}
+    if has_index and not rebuild and not to_add and not remove_ids and new_manifest == manifest:
+        print(f"[INFO] Index is up to date ({summary['files']} files)")
+        return summary
+    if not has_index and not to_add:
+        raise ValueError(f"No documents to index in {docs_dir}")
+
+    vectors = embeddings.embed_documents([chunk.page_content for chunk in to_add]) if to_add else []
+    dimensions = len(vectors[0]) if vectors else 0
+    store = IndexStore.open_for_update(f"{index_path}.tmp-{os.getpid()}", dimensions,
+                                       base=index_path if has_index else None,
+                                       settings=settings, rebuild=rebuild)
+    store.remove(remove_ids)
+    store.add(add_ids, to_add, vectors)
+    with open(os.path.join(store.path, MANIFEST_NAME), "w") as f:
+        json.dump(new_manifest, f, indent=2)
+    store.commit(index_path)
+    print(f"[INFO] Ingested {summary['files']} files: +{summary['added']} / -{summary['removed']} chunks"
+          f" ({settings['type']} index{', rebuilt' if rebuild and has_index else ''})")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", default=DOCS_DIR, help="directory of .pdf/.txt/.md documents")
+    parser.add_argument("--index", default=INDEX_PATH, help="index directory")
+    args = parser.parse_args()
+    ingest(args.docs, args.index)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,58 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterator, List, Optional
+
+import fitz  # PyMuPDF
 from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 from langchain_openai import OpenAI, OpenAIEmbeddings
 from dotenv import load_dotenv
+from chunking import TokenChunker
+from config import config
 
 
 load_dotenv()
-FILENAME = "/home/ayush/Projects_1/sales-bot/sales-bot-prediction/backend/finance_company_pricing.pdf"
+FILENAME = "/home/ayush/Projects_1/sales-bot/sales-bot-prediction/backend/documents/finance_company_pricing.pdf"
+PAGES_PER_TASK = 8  # pages parsed and split per worker task
+chunking_config = config.get("chunking", {})
+CHUNK_TOKENS = chunking_config.get("chunk_tokens", 500)
+CHUNK_OVERLAP_TOKENS = chunking_config.get("chunk_overlap_tokens", 100)
+# "bytes" skips the tiktoken download altogether (see chunking.py)
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", chunking_config.get("encoding", "cl100k_base"))
+
+def make_text_splitter():
+    # Chunks are measured in LLM tokens and carry metadata["token_count"]
+    return TokenChunker(chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS, encoding_name=CHUNK_ENCODING)
+
+def parse_and_split_pages(filename, start, stop) -> List[Document]:
+    # Runs in a worker process: parse pages [start, stop) with PyMuPDF and split them
+    with fitz.open(filename) as pdf:
+        pages = [
+            Document(page_content=pdf[page_no].get_text(),
+                     metadata={"source": filename, "page": page_no, "total_pages": pdf.page_count})
+            for page_no in range(start, stop)
+        ]
+    return make_text_splitter().split_documents(pages)
+
 class DocumentLoader:
 
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
         self.model = ''
+        self.workers = workers
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def pdf_loader(self, filename):
         loader = PyPDFLoader(filename)
@@ -17,20 +60,39 @@ class DocumentLoader:
         for page in loader.load():
             pages.append(page)
         return pages
-    
+
     def splitting_text(self,documents):
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size = 500, 
-                                               chunk_overlap = 200,
-                                               length_function = lambda text:len(text.split()))
+        text_splitter = make_text_splitter()
 
         texts = text_splitter.split_documents(documents)
         return texts
 
+    def iter_pdf_chunks(self, filename) -> Iterator[Document]:
+        """Parse and split a PDF across a process pool, yielding chunks in page order.
+
+        Chunks carry `source`, `page` (0-based) and `total_pages` metadata, like
+        PyPDFLoader pages. With workers=1 (or a short PDF) everything runs inline.
+        """
+        with fitz.open(filename) as pdf:
+            page_count = pdf.page_count
+        starts = list(range(0, page_count, PAGES_PER_TASK))
+        stops = [min(start + PAGES_PER_TASK, page_count) for start in starts]
+
+        if self.workers == 1 or len(starts) <= 1:
+            for start, stop in zip(starts, stops):
+                yield from parse_and_split_pages(filename, start, stop)
+            return
+
+        if self._pool is None:
+            # Fresh workers rather than forks of a process that may hold threads and open clients
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("forkserver"))
+        for chunks in self._pool.map(parse_and_split_pages, repeat(filename), starts, stops):
+            yield from chunks
+
 
 def load_and_split_pdf(filename):
-    loader = DocumentLoader()
-    documents = loader.pdf_loader(filename)
-    texts = loader.splitting_text(documents)
+    with DocumentLoader() as loader:
+        texts = list(loader.iter_pdf_chunks(filename))
     print(f"[INFO] Total split documents: {len(texts)}")
     return texts
-
@@ -0,0 +1,273 @@
+"""Captured leads: an indexed SQLite store and a write-behind queue in front of it.
+
+POST /leads only enqueues; LeadWriter flushes the queue in batches, each in
+one transaction, so a burst of form submissions costs one fsync per batch
+instead of one per lead. A lead is deduplicated on its normalised email,
+then its normalised phone number; a repeat submission is merged into the
+stored row: blank fields are filled in and the highest question count and
+intent score kept. Only a lead marked "overwrite" (sent with the leads token,
+or imported from the old JSON file) replaces the stored name and session,
+since anyone who knows an email address can submit the form.
+
+    python leads.py ../frontend/leads.json   # import the old JSON-lines file
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import suppress
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+LEAD_TYPES = ("HOT_LEAD", "WARM_LEAD")
+
+NON_DIGITS_RE = re.compile(r"\D")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    email_key TEXT NOT NULL,
+    phone_key TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    questions_asked INTEGER NOT NULL,
+    intent_score INTEGER NOT NULL,
+    user_type TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leads_email_key ON leads (email_key) WHERE email_key != '';
+CREATE INDEX IF NOT EXISTS leads_phone_key ON leads (phone_key) WHERE phone_key != '';
+CREATE INDEX IF NOT EXISTS leads_created ON leads (created_at, id);
+CREATE INDEX IF NOT EXISTS leads_type_created ON leads (user_type, created_at, id);
+"""
+
+COLUMNS = ("id", "name", "email", "phone", "session_id", "source", "questions_asked", "intent_score",
+           "user_type", "created_at", "updated_at")
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    digits = NON_DIGITS_RE.sub("", phone)
+    # "+91 98765 43210" and "098765-43210" are the same number as "9876543210"
+    return digits[-10:] if len(digits) > 10 else digits
+
+
+class LeadStore:
+    def __init__(self, path: str, lead_type: Callable[[int], str]):
+        self.path = path
+        # HOT_LEAD / WARM_LEAD for an intent score (IntentScorer.lead_type)
+        self.lead_type = lead_type
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _find(self, conn, email_key: str, phone_key: str) -> Optional[tuple]:
+        for column, key in (("email_key", email_key), ("phone_key", phone_key)):
+            if key:
+                row = conn.execute(f"""
+                    SELECT id, name, email, phone, email_key, phone_key, session_id, questions_asked, intent_score
+                    FROM leads WHERE {column} = ? ORDER BY id LIMIT 1
+                """, (key,)).fetchone()
+                if row:
+                    return row
+        return None
+
+    def upsert_many(self, leads: List[dict]) -> Tuple[int, int]:
+        """Insert or merge a batch of leads in one transaction; returns (inserted, merged)."""
+        inserted = merged = 0
+        conn = self._conn()
+        # BEGIN IMMEDIATE serialises writers across worker processes, so two
+        # submissions of one lead can't both insert
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for lead in leads:
+                email_key, phone_key = normalize_email(lead["email"]), normalize_phone(lead["phone"])
+                now = lead.get("submitted_at") or time.time()
+                row = self._find(conn, email_key, phone_key)
+                if row is None:
+                    conn.execute("""
+                        INSERT INTO leads (name, email, phone, email_key, phone_key, session_id, source,
+                                           questions_asked, intent_score, user_type, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (lead["name"], lead["email"].strip(), lead["phone"].strip(), email_key, phone_key,
+                          lead["session_id"], lead["source"], lead["questions_asked"], lead["intent_score"],
+                          self.lead_type(lead["intent_score"]), now, now))
+                    inserted += 1
+                    continue
+                lead_id, name, email, phone, old_email_key, old_phone_key, session_id, questions, score = row
+                score = max(score, lead["intent_score"])
+                if lead.get("overwrite"):
+                    name, session_id = lead["name"] or name, lead["session_id"] or session_id
+                conn.execute("""
+                    UPDATE leads SET name = ?, email = ?, phone = ?, email_key = ?, phone_key = ?, session_id = ?,
+                                     questions_asked = ?, intent_score = ?, user_type = ?, updated_at = ?
+                    WHERE id = ?
+                """, (name or lead["name"],
+                      email if old_email_key else lead["email"].strip(),
+                      phone if old_phone_key else lead["phone"].strip(),
+                      old_email_key or email_key, old_phone_key or phone_key,
+                      session_id or lead["session_id"], max(questions, lead["questions_asked"]), score,
+                      self.lead_type(score), now, lead_id))
+                merged += 1
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return inserted, merged
+
+    def query(self, user_type: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 50, cursor: Optional[Tuple[float, int]] = None) -> Tuple[List[dict], Optional[str]]:
+        """Leads newest first, optionally by type and created_at range.
+
+        Pages by keyset on (created_at, id): `cursor` is the `next_cursor` of
+        the previous page, so deep pages cost the same as the first.
+        """
+        where, params = [], []
+        if user_type:
+            where.append("user_type = ?")
+            params.append(user_type)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        if cursor is not None:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM leads"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._conn().execute(sql, params + [limit + 1]).fetchall()
+        leads = [dict(zip(COLUMNS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = f"{leads[-1]['created_at']!r}:{leads[-1]['id']}"
+        for lead in leads:
+            for key in ("created_at", "updated_at"):
+                lead[key] = datetime.fromtimestamp(lead[key]).isoformat()
+        return leads, next_cursor
+
+    def import_json_lines(self, path: str) -> int:
+        """Import leads from the old frontend leads.json (one JSON object per line)."""
+        leads = []
+        with open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                leads.append({
+                    "name": data.get("name", ""),
+                    "email": data.get("email", ""),
+                    "phone": data.get("phone", ""),
+                    "session_id": data.get("session_id", ""),
+                    "source": data.get("source", "chatbot"),
+                    "questions_asked": data.get("questions_asked", 0),
+                    "intent_score": data.get("intent_score", 0),
+                    # Replayed oldest first, so the latest name and session win as before
+                    "overwrite": True,
+                    "submitted_at": datetime.fromisoformat(data["timestamp"]).timestamp()
+                    if data.get("timestamp") else None,
+                })
+        self.upsert_many(leads)
+        return len(leads)
+
+
+def parse_cursor(cursor: str) -> Tuple[float, int]:
+    created_at, _, lead_id = cursor.partition(":")
+    return float(created_at), int(lead_id)
+
+
+class LeadWriter:
+    """Write-behind queue: `submit` never touches the disk; a background task
+    writes batches of up to `batch_size` leads, at most `flush_interval_seconds`
+    after the first one of a batch arrived."""
+
+    def __init__(self, store: LeadStore, batch_size: int = 100, flush_interval_seconds: float = 0.5,
+                 max_queue: int = 10000):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.inserted = 0
+        self.merged = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[dict] = []
+
+    def submit(self, lead: dict):
+        """Queue a lead; raises asyncio.QueueFull if the writer is too far behind."""
+        self.queue.put_nowait(dict(lead, submitted_at=time.time()))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Write out the batch being collected and whatever is still queued
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        batch, self._batch = self._batch, []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        await self._flush(batch)
+
+    async def _run(self):
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = time.monotonic() + self.flush_interval_seconds
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._batch = self._batch, []
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]):
+        if not batch:
+            return
+        try:
+            inserted, merged = await asyncio.to_thread(self.store.upsert_many, batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"[ERROR] Could not write {len(batch)} leads: {type(e).__name__}: {e}")
+            return
+        self.inserted += inserted
+        self.merged += merged
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit(__doc__)
+    from config import config
+    from scoring import IntentScorer
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        config.get("leads", {}).get("sqlite_path", "leads.sqlite3"))
+    store = LeadStore(path, IntentScorer(config.get("scoring", {})).lead_type)
+    print(f"Imported {store.import_json_lines(sys.argv[1])} leads into {path}")
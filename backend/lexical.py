@@ -0,0 +1,55 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# Numbers keep their decimals ("8.5", "100000") and are also emitted with a
+# trailing "%" when written as a percentage; currency symbols are tokens of
+# their own, so "₹5 Crores" and "5 crores" share "5" and "crores"
+TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)*%?|[^\W\d_]+|[₹$€£]", re.UNICODE)
+
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token[0].isdigit():
+            number = token.rstrip("%").replace(",", "")
+            tokens.append(number)
+            if token.endswith("%"):
+                tokens.append(number + "%")
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def term_frequencies(text: str) -> Tuple[Counter, int]:
+    tokens = tokenize(text)
+    return Counter(tokens), len(tokens)
+
+
+def idf(doc_count: int, doc_freq: int) -> float:
+    return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def bm25(postings: Dict[str, List[Tuple[int, int, int]]], doc_count: int, avg_length: float,
+         query_terms: Iterable[str]) -> Tuple[Dict[int, float], float]:
+    """Okapi BM25 scores from `postings[term] = [(doc_id, tf, doc_length), ...]`.
+
+    Also returns the best score any document could get for these terms (every
+    term present, tf saturated), which callers use to judge confidence.
+    """
+    scores: Dict[int, float] = {}
+    ideal = 0.0
+    for term in set(query_terms):
+        docs = postings.get(term)
+        if not docs:
+            continue
+        weight = idf(doc_count, len(docs))
+        ideal += weight * (K1 + 1)
+        for doc_id, tf, length in docs:
+            norm = tf + K1 * (1 - B + B * length / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf * (K1 + 1) / norm
+    return scores, ideal
@@ -0,0 +1,218 @@
+"""End-to-end load test for /ask and /ask/stream.
+
+--users virtual users each replay a mix of quick-FAQ questions, standalone
+pricing questions and multi-turn conversations for --duration seconds, and the
+report gives throughput and p50/p95/p99 latency per path (instant FAQ, answer
+cache hit, RAG, RAG follow-up). With --stream, time to first token is
+reported too; it is only meaningful with --url, as httpx's ASGI transport
+buffers the whole response.
+
+By default the app runs in-process over httpx's ASGI transport with the
+offline fake LLM and embeddings (see providers.py) and its own index in
+faiss_index_loadtest/, so no credits are spent; the fake latencies come from
+"providers" in config.json. --url targets a running server instead, with
+whatever providers it was started with. Run from the backend directory:
+
+    python loadtest.py [--users 50] [--duration 30] [--mix faq=3,rag=4,multi=3] [--stream]
+    python loadtest.py --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from contextlib import AsyncExitStack
+
+import httpx
+import numpy as np
+
+PRODUCTS = ["home loan", "personal loan", "car loan", "business loan", "gold loan", "education loan"]
+ASPECTS = [
+    "What is the interest rate on a {}?",
+    "What is the processing fee for a {}?",
+    "What is the maximum tenure of a {}?",
+    "Can I prepay a {}?",
+    "How much {} can I get?",
+]
+CONVERSATIONS = [
+    ["What is the interest rate on a home loan?", "And what is the maximum tenure?", "Can I prepay it?"],
+    ["Tell me about personal loans", "What documents do I need for that?", "How fast is disbursal?"],
+    ["Do you offer car loans?", "What about the processing fee?", "Is there a prepayment penalty on those?"],
+    ["I run a small business", "How much can I borrow?", "What rate would I pay?"],
+]
+
+
+def faq_questions():
+    from config import config
+    questions = []
+    for faq in config.get("quick_faqs", {}).values():
+        questions.extend(faq.get("questions", []))
+        questions.extend(f"what about {keyword}?" for keyword in faq.get("keywords", []))
+    return questions
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {"faq", "rag", "multi"}
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s) in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def in_process_app():
+    # Must be set before app (and ingest/providers) is imported
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("EMBEDDINGS_PROVIDER", "fake")
+    os.environ.setdefault("KNOWLEDGE_INDEX_PATH",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "faiss_index_loadtest"))
+    import app
+    return app.app
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.first_token = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, path, seconds, first_token=None):
+        self.latencies[path].append(seconds)
+        if first_token is not None:
+            self.first_token[path].append(first_token)
+
+    def total(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    def report(self, elapsed):
+        total = self.total()
+        print(f"{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, "
+              f"{sum(self.errors.values())} errors {dict(self.errors) or ''}")
+        header = f"{'path':<14} {'count':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        if self.first_token:
+            header += f" {'ttft p50':>9} {'ttft p95':>9}"
+        print(header)
+        for path in sorted(self.latencies):
+            ms = np.array(self.latencies[path]) * 1000
+            line = (f"{path:<14} {len(ms):>6} {len(ms) / elapsed:>7.1f} {np.percentile(ms, 50):>8.1f} "
+                    f"{np.percentile(ms, 95):>8.1f} {np.percentile(ms, 99):>8.1f}")
+            if self.first_token.get(path):
+                ttft = np.array(self.first_token[path]) * 1000
+                line += f" {np.percentile(ttft, 50):>9.1f} {np.percentile(ttft, 95):>9.1f}"
+            print(line)
+
+
+def response_path(body, follow_up):
+    if body.get("is_instant_faq"):
+        return "faq"
+    if body.get("is_cached"):
+        return "cached"
+    return "rag_follow_up" if follow_up else "rag"
+
+
+async def ask(client, results, question, session_id, follow_up, stream):
+    payload = {"user_query": question, "session_id": session_id}
+    start = time.perf_counter()
+    try:
+        if not stream:
+            response = await client.post("/ask", json=payload)
+            response.raise_for_status()
+            results.record(response_path(response.json(), follow_up), time.perf_counter() - start)
+            return
+        first_token = None
+        event = None
+        async with client.stream("POST", "/ask/stream", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    if event == "token" and first_token is None:
+                        first_token = time.perf_counter() - start
+                    elif event == "done":
+                        path = response_path(json.loads(line[len("data: "):]), follow_up)
+                        results.record(path, time.perf_counter() - start, first_token)
+                    elif event == "error":
+                        results.errors["stream error"] += 1
+    except httpx.HTTPStatusError as e:
+        results.errors[f"HTTP {e.response.status_code}"] += 1
+    except httpx.HTTPError as e:
+        results.errors[type(e).__name__] += 1
+
+
+async def virtual_user(client, results, mix, faqs, deadline, stream, rng):
+    scenarios, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        session_id = f"load-{uuid.uuid4().hex}"
+        if scenario == "faq":
+            turns = [rng.choice(faqs)]
+        elif scenario == "rag":
+            turns = [rng.choice(ASPECTS).format(rng.choice(PRODUCTS))]
+        else:
+            turns = rng.choice(CONVERSATIONS)
+        for i, question in enumerate(turns):
+            if time.perf_counter() >= deadline:
+                break
+            await ask(client, results, question, session_id, follow_up=i > 0, stream=stream)
+
+
+async def wait_until_ready(client, timeout):
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get("/readyz")
+        if response.status_code == 200:
+            return
+        if response.json().get("status") == "failed" or time.perf_counter() > deadline:
+            raise SystemExit(f"App did not become ready: {response.text}")
+        await asyncio.sleep(0.2)
+
+
+async def run(args):
+    faqs = faq_questions()
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    results = Results()
+    async with AsyncExitStack() as stack:
+        if args.url:
+            transport, base_url = None, args.url
+        else:
+            # The ASGI transport does not run lifespan events, so start them here
+            app = in_process_app()
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport, base_url = httpx.ASGITransport(app=app), "http://loadtest"
+        client = await stack.enter_async_context(httpx.AsyncClient(
+            transport=transport, base_url=base_url, timeout=args.timeout, limits=limits))
+        await wait_until_ready(client, args.ready_timeout)
+        start = time.perf_counter()
+        deadline = start + args.duration
+        rng = random.Random(args.seed)
+        await asyncio.gather(*(
+            virtual_user(client, results, mix, faqs, deadline, args.stream, random.Random(rng.random()))
+            for _ in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: in-process with fake providers)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default="faq=3,rag=4,multi=3", help="scenario weights")
+    parser.add_argument("--stream", action="store_true", help="use /ask/stream and report time to first token")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--ready-timeout", type=float, default=600, help="seconds to wait for /readyz")
+    parser.add_argument("--seed", type=int, default=0)
+    results, elapsed = asyncio.run(run(parser.parse_args()))
+    results.report(elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ANY_TAB = "*"
+
+
+class NudgeRules:
+    """Landing-page nudges from "tab_nudges" in config.json.
+
+    Each rule names a tab (or "*" for every tab), how long the visitor must
+    have been on the page and the minimum intent score. Rules are tried in
+    order: a tab gets the message of its first due rule, and `decide` also
+    says how many seconds until an earlier rule of any tab becomes due, so
+    the page only needs to check back then (or never, once nothing is pending).
+    """
+
+    def __init__(self, rules: List[dict]):
+        self.rules = []
+        for rule in rules:
+            if not rule.get("message"):
+                raise ValueError(f"Nudge rule without a message: {rule}")
+            self.rules.append({
+                "tab": rule.get("tab", ANY_TAB),
+                "delay_seconds": float(rule.get("delay_seconds", 0)),
+                "min_intent_score": rule.get("min_intent_score", 0),
+                "message": rule["message"],
+            })
+
+    def decide(self, tabs: Iterable[str], seconds_on_page: float, intent_score: int,
+               dismissed: Iterable[str] = ()) -> Tuple[Dict[str, str], Optional[float]]:
+        """Return ({tab: message} for nudges due now, seconds until the next one or None)."""
+        dismissed = set(dismissed)
+        nudges = {}
+        next_check = None
+        for tab in tabs:
+            if tab in dismissed:
+                continue
+            for rule in self.rules:
+                if rule["tab"] not in (tab, ANY_TAB) or intent_score < rule["min_intent_score"]:
+                    continue
+                wait = rule["delay_seconds"] - seconds_on_page
+                if wait <= 0:
+                    nudges[tab] = rule["message"]
+                    break
+                next_check = wait if next_check is None else min(next_check, wait)
+        return nudges, next_check
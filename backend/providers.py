@@ -0,0 +1,44 @@
+import os
+
+from dotenv import load_dotenv
+
+from config import config
+
+load_dotenv()
+
+# "openai" (default) or "fake" (see fakes.py); the environment wins over config.json
+provider_config = config.get("providers", {})
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", provider_config.get("llm", "openai"))
+EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", provider_config.get("embeddings", "openai"))
+PROVIDERS = ("openai", "fake")
+
+def make_chat_model(model: str, temperature: float):
+    if LLM_PROVIDER == "openai":
+        from langchain_openai import ChatOpenAI
+        # stream_usage reports token counts for streamed answers too
+        return ChatOpenAI(model=model, temperature=temperature, api_key=os.getenv("OPENAI_API_KEY"),
+                          stream_usage=True)
+    if LLM_PROVIDER == "fake":
+        from fakes import CannedChatModel
+        fake = provider_config.get("fake_llm", {})
+        return CannedChatModel(
+            median_ms=fake.get("median_ms", 400),
+            sigma=fake.get("sigma", 0.35),
+            tokens_per_second=fake.get("tokens_per_second", 50),
+        )
+    raise ValueError(f"Unknown LLM provider {LLM_PROVIDER!r}, expected one of {PROVIDERS}")
+
+def make_embeddings(model: str, dimensions: int):
+    if EMBEDDINGS_PROVIDER == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=model, dimensions=dimensions)
+    if EMBEDDINGS_PROVIDER == "fake":
+        from fakes import HashEmbeddings
+        fake = provider_config.get("fake_embeddings", {})
+        return HashEmbeddings(size=dimensions, median_ms=fake.get("median_ms", 30), sigma=fake.get("sigma", 0.3))
+    raise ValueError(f"Unknown embeddings provider {EMBEDDINGS_PROVIDER!r}, expected one of {PROVIDERS}")
+
+def embeddings_namespace(model: str, dimensions: int) -> str:
+    # Keys the embedding cache and the index, so vectors of different providers never mix
+    name = model if EMBEDDINGS_PROVIDER == "openai" else f"{EMBEDDINGS_PROVIDER}-hash"
+    return f"{name}:{dimensions}"
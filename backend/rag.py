@@ -0,0 +1,120 @@
+import re
+from typing import AsyncIterator, List, Optional, Tuple
+
+from langchain.chains.conversational_retrieval.prompts import CONDENSE_QUESTION_PROMPT
+from langchain_core.output_parsers import StrOutputParser
+
+from tracing import stage
+
+# One (question, answer) pair per turn
+History = List[Tuple[str, str]]
+
+# How the retrieval query is built from a follow-up question:
+#   condense     - ask the LLM to rewrite it as a standalone question (skipped when
+#                  there is no history); two LLM calls per follow-up turn
+#   heuristic    - if it looks like a follow-up, prepend the previous question;
+#                  one LLM call
+#   single_call  - retrieve on the question as typed and let the answer prompt
+#                  resolve references from the chat history; one LLM call
+ANSWER_MODES = ("condense", "heuristic", "single_call")
+
+FOLLOW_UP_RE = re.compile(
+    r"^(and|also|what about|how about|same|then)\b|\b(it|its|it's|that|this|those|these|they|them|their)\b",
+    re.IGNORECASE,
+)
+
+
+def format_history(history: History) -> str:
+    # Same layout ConversationalRetrievalChain used for the prompts
+    return "".join(f"\nHuman: {question}\nAssistant: {answer}" for question, answer in history)
+
+
+class RAGPipeline:
+    """Stateless condense -> retrieve -> answer pipeline shared by all sessions.
+
+    Built once at startup; per-session state is only the compact history that
+    is passed in on each call.
+    """
+
+    def __init__(self, llm, retriever, prompt, condense_prompt=CONDENSE_QUESTION_PROMPT,
+                 mode: str = "condense", max_context_tokens: Optional[int] = None):
+        if mode not in ANSWER_MODES:
+            raise ValueError(f"Unknown answer mode {mode!r}, expected one of {ANSWER_MODES}")
+        self.mode = mode
+        self.max_context_tokens = max_context_tokens
+        self.retriever = retriever
+        self.condense_chain = condense_prompt | llm | StrOutputParser()
+        self.answer_chain = prompt | llm | StrOutputParser()
+
+    @staticmethod
+    def heuristic_rewrite(question: str, history: History) -> str:
+        """Cheap stand-in for the condense call: short or anaphoric follow-ups are
+        prefixed with the previous question so retrieval keeps its topic."""
+        if history and (len(question.split()) <= 4 or FOLLOW_UP_RE.search(question)):
+            return f"{history[-1][0]} {question}"
+        return question
+
+    def pack_context(self, docs) -> list:
+        """Keep retrieved chunks, best first, while they fit `max_context_tokens`.
+
+        Uses the token counts stored by the chunker, so nothing is re-measured;
+        chunks without a count (older indexes) are always kept.
+        """
+        if not self.max_context_tokens:
+            return list(docs)
+        packed, used = [], 0
+        for doc in docs:
+            tokens = doc.metadata.get("token_count")
+            if tokens is not None:
+                if packed and used + tokens > self.max_context_tokens:
+                    continue
+                used += tokens
+            packed.append(doc)
+        return packed
+
+    async def prepare(self, question: str, history: History, retriever=None) -> dict:
+        """Build the retrieval query according to `mode` and retrieve context,
+        with `retriever` if given, else the pipeline's.
+
+        Returns the inputs for the answer prompt plus the retrieved documents.
+        """
+        retriever = retriever or self.retriever
+        chat_history = format_history(history)
+        standalone = question
+        if history and self.mode == "condense":
+            with stage("condense"):
+                standalone = await self.condense_chain.ainvoke({"question": question, "chat_history": chat_history})
+        elif self.mode == "heuristic":
+            standalone = self.heuristic_rewrite(question, history)
+        with stage("retrieve"):
+            docs = self.pack_context(await retriever.ainvoke(standalone))
+        return {
+            # Outside condense mode the answer prompt gets the question as typed
+            # and relies on the chat history for references
+            "question": standalone if self.mode == "condense" else question,
+            "generated_question": standalone,
+            "chat_history": chat_history,
+            "context": "\n\n".join(doc.page_content for doc in docs),
+            "source_documents": docs,
+        }
+
+    @staticmethod
+    def _prompt_inputs(prepared: dict) -> dict:
+        return {key: prepared[key] for key in ("question", "chat_history", "context")}
+
+    async def ainvoke(self, question: str, history: History, retriever=None) -> dict:
+        prepared = await self.prepare(question, history, retriever)
+        with stage("generate"):
+            answer = await self.answer_chain.ainvoke(self._prompt_inputs(prepared))
+        return {
+            "answer": answer,
+            "generated_question": prepared["generated_question"],
+            "source_documents": prepared["source_documents"],
+        }
+
+    async def astream_answer(self, prepared: dict) -> AsyncIterator[str]:
+        """Stream the answer for the output of `prepare`."""
+        with stage("generate"):
+            async for chunk in self.answer_chain.astream(self._prompt_inputs(prepared)):
+                if chunk:
+                    yield chunk
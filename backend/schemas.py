@@ -1,13 +1,82 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 # Request / Response Models
 class UserQuery(BaseModel):
     user_query: str
     session_id: str = "default_session"
+    intent_score: int = 0  # the conversation's score so far, page events included
 
 class BotResponse(BaseModel):
     bot_response: str
     sources: List[str] = []
     is_instant_faq: bool = False
+    is_cached: bool = False
     nudge: Optional[str] = None
+    intent_score: int = 0  # this question's intent score (see scoring.py)
+    # For the conversation's score so far plus this question's
+    user_type: str = "BROWSING"
+    lead_form: bool = False  # whether to offer the lead form
+
+class NudgeRequest(BaseModel):
+    session_id: str = "default_session"
+    tabs: List[str]
+    seconds_on_page: float
+    intent_score: int = 0
+    dismissed: List[str] = []
+
+class NudgeResponse(BaseModel):
+    nudges: Dict[str, str] = {}  # tab -> message, for the tabs that should show one now
+    next_check_seconds: Optional[float] = None  # when another nudge becomes due; None if none will
+    # For the request's intent_score
+    user_type: str = "BROWSING"
+    lead_form: bool = False
+
+class LeadSubmission(BaseModel):
+    name: str
+    email: str = ""
+    phone: str = ""
+    session_id: str = ""
+    source: str = "chatbot"
+    questions_asked: int = 0
+    intent_score: int = 0
+
+class Lead(BaseModel):
+    id: int
+    name: str
+    email: str
+    phone: str
+    session_id: str
+    source: str
+    questions_asked: int
+    intent_score: int
+    user_type: str
+    created_at: str
+    updated_at: str
+
+class LeadPage(BaseModel):
+    leads: List[Lead]
+    next_cursor: Optional[str] = None  # pass back as `cursor` for the next page
+
+class ScoredQuestion(BaseModel):
+    text: str
+    faq_category: Optional[str] = None  # quick FAQ that answered it, if any
+    products: List[str] = []  # product signals recorded when it was answered
+
+class ConversationToScore(BaseModel):
+    id: str
+    questions: List[ScoredQuestion] = []
+    events: Dict[str, int] = {}  # page event -> count, e.g. {"calculate_emi": 1}
+
+class ScoreBatchRequest(BaseModel):
+    conversations: List[ConversationToScore]
+    # Trial overrides per section of "scoring" in config.json, e.g. {"keywords": {"emi": 4}}
+    scoring: Optional[Dict[str, Dict[str, float]]] = None
+
+class ConversationScore(BaseModel):
+    id: str
+    intent_score: float
+    user_type: str
+
+class ScoreBatchResponse(BaseModel):
+    scores: List[ConversationScore]
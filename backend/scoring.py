@@ -0,0 +1,126 @@
+"""Weighted intent scoring from "scoring" in config.json.
+
+A question scores the summed weights of the distinct signals it shows:
+keywords and product names in its text (matched on whole words with the
+FAQ trie), the quick FAQ it was answered by, and, when the question shows
+a keyword but names no product, the product mentioned most in the top
+retrieved chunk (`context_products`, kept with cached answers so a cached
+answer scores the same). Page events (EMI calculator, eligibility
+check...) have their own weights. The thresholds that turn a score into
+HOT_LEAD / WARM_LEAD / BROWSING and show the lead form are applied here
+only; the frontend uses the user type the API returns.
+
+`score_batch` re-scores whole conversations at once: signals are counted
+into a conversations x features matrix and multiplied by the weight
+vector, so trying new weights on stored conversations needs no LLM or
+retrieval calls.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from faq_matcher import PhraseMatcher
+
+DEFAULT_THRESHOLDS = {"hot_lead": 6, "warm_lead": 1, "lead_form": 4}
+
+
+class IntentScorer:
+    def __init__(self, scoring_config: dict):
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **scoring_config.get("thresholds", {}))
+        # One column per feature; the weight vector is aligned with it
+        self.features: List[str] = []
+        weights: List[float] = []
+        self._index: Dict[str, int] = {}
+        self._keywords = PhraseMatcher()
+        self._products = PhraseMatcher()
+
+        def add_feature(name: str, weight: float) -> int:
+            self._index[name] = len(self.features)
+            self.features.append(name)
+            weights.append(float(weight))
+            return self._index[name]
+
+        for phrase, weight in scoring_config.get("keywords", {}).items():
+            self._keywords.add(phrase, add_feature(f"keyword:{phrase}", weight))
+        for product, weight in scoring_config.get("products", {}).items():
+            self._products.add(product, add_feature(f"product:{product}", weight))
+        for category, weight in scoring_config.get("faq_categories", {}).items():
+            add_feature(f"faq:{category}", weight)
+        for event, weight in scoring_config.get("events", {}).items():
+            add_feature(f"event:{event}", weight)
+        self.weights = np.array(weights, dtype=np.float64)
+
+    def context_products(self, context: str) -> List[str]:
+        """The product retrieved text is most about, if it names any. A chunk
+        often lists several products; only this one is credited."""
+        mentions = Counter(column for column, _ in self._products.find(context))
+        return [self.features[column][len("product:"):] for column, _ in mentions.most_common(1)]
+
+    def question_features(self, question: str, faq_category: Optional[str] = None,
+                          context_products: Sequence[str] = (), products: Sequence[str] = ()) -> set:
+        """Columns of the distinct signals of one question.
+
+        `context_products` (from `context_products`) only count when the
+        question has a keyword but names no product; `products` are product
+        signals recorded earlier.
+        """
+        columns = {column for column, _ in self._keywords.find(question)}
+        named = {column for column, _ in self._products.find(question)}
+        if not named and columns:
+            named = {self._index[f"product:{product}"] for product in context_products
+                     if f"product:{product}" in self._index}
+        columns |= named
+        for name in [f"faq:{faq_category}"] + [f"product:{product}" for product in products]:
+            if name in self._index:
+                columns.add(self._index[name])
+        return columns
+
+    def score_question(self, question: str, faq_category: Optional[str] = None,
+                       context_products: Sequence[str] = ()) -> int:
+        columns = self.question_features(question, faq_category, context_products)
+        return int(self.weights[list(columns)].sum()) if columns else 0
+
+    def score_event(self, event: str) -> int:
+        column = self._index.get(f"event:{event}")
+        return int(self.weights[column]) if column is not None else 0
+
+    def user_types(self, scores) -> List[str]:
+        scores = np.asarray(scores, dtype=np.float64)
+        hot, warm = self.thresholds["hot_lead"], self.thresholds["warm_lead"]
+        return np.where(scores >= hot, "HOT_LEAD", np.where(scores >= warm, "WARM_LEAD", "BROWSING")).tolist()
+
+    def user_type(self, score: float) -> str:
+        return self.user_types([score])[0]
+
+    def lead_form_due(self, score: float) -> bool:
+        return score >= self.thresholds["lead_form"]
+
+    def lead_type(self, score: float) -> str:
+        # Someone who left their details is at least a warm lead
+        return "HOT_LEAD" if score >= self.thresholds["hot_lead"] else "WARM_LEAD"
+
+    def feature_matrix(self, conversations: Iterable[Tuple[Sequence[dict], Dict[str, int]]]) -> np.ndarray:
+        """Signal counts, one row per (questions, events) conversation; a question
+        is {"text", "faq_category"?, "products"?}."""
+        rows = []
+        # Stored conversations repeat the same FAQ questions a lot
+        seen: Dict[tuple, List[int]] = {}
+        for questions, events in conversations:
+            row = np.zeros(len(self.features), dtype=np.float64)
+            for question in questions:
+                key = (question["text"], question.get("faq_category"), tuple(question.get("products", ())))
+                columns = seen.get(key)
+                if columns is None:
+                    columns = seen[key] = list(self.question_features(key[0], key[1], products=key[2]))
+                row[columns] += 1
+            for event, count in events.items():
+                column = self._index.get(f"event:{event}")
+                if column is not None:
+                    row[column] += count
+            rows.append(row)
+        return np.vstack(rows) if rows else np.zeros((0, len(self.features)))
+
+    def score_batch(self, conversations: Sequence[Tuple[Sequence[dict], Dict[str, int]]]) -> Tuple[np.ndarray, List[str]]:
+        scores = self.feature_matrix(conversations) @ self.weights
+        return scores, self.user_types(scores)
@@ -0,0 +1,43 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticFAQRouter:
+    """Routes paraphrased questions to quick FAQs by embedding similarity.
+
+    Each FAQ's keywords and canonical `questions` from config.json are
+    embedded once, at startup, into one row-normalised matrix, so matching a
+    query vector is a single matrix-vector product. A query is routed to the
+    FAQ of its most similar row when the cosine similarity reaches
+    `similarity_threshold`.
+    """
+
+    def __init__(self, quick_faqs: Dict[str, dict], embeddings, similarity_threshold: float = 0.75):
+        self.similarity_threshold = similarity_threshold
+        texts: List[str] = []
+        self._row_faq: List[str] = []
+        for faq_name, faq_data in quick_faqs.items():
+            for text in list(faq_data.get("questions", [])) + list(faq_data.get("keywords", [])):
+                texts.append(text)
+                self._row_faq.append(faq_name)
+        self._matrix = self._normalise(np.asarray(embeddings.embed_documents(texts), dtype=np.float32)) \
+            if texts else None
+
+    @staticmethod
+    def _normalise(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def __len__(self):
+        return len(self._row_faq)
+
+    def match(self, vector) -> Optional[Tuple[str, float]]:
+        """(faq_name, similarity) of the closest FAQ above the threshold, else None."""
+        if self._matrix is None:
+            return None
+        similarities = self._matrix @ self._normalise(np.asarray(vector, dtype=np.float32))
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return self._row_faq[best], float(similarities[best])
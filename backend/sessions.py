@@ -0,0 +1,331 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+SESSION_BACKENDS = ("memory", "sqlite")
+
+
+@dataclass
+class Session:
+    session_id: str = ""
+    history: List[Tuple[str, str]] = field(default_factory=list)  # (question, answer) per turn
+    question_count: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_seen: float = field(default_factory=time.monotonic)
+    version: int = 0  # of the stored history, for optimistic concurrency
+
+
+class SessionStore(ABC):
+    """History and question counts per session.
+
+    Turns of one session go through `turn()`, which serialises them within
+    this process and loads the current history; `add_turn` then records the
+    new exchange, trimmed to the last `history_turns` exchanges (and, if
+    configured, at most `max_history_tokens` tokens of them). Methods that may
+    do I/O are coroutines, so a store can keep it off the event loop.
+    """
+
+    def __init__(self, history_turns: int = 5, max_history_tokens: Optional[int] = None,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        self.history_turns = history_turns
+        self.max_history_tokens = max_history_tokens
+        self.token_counter = token_counter
+
+    def trim(self, history: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        if self.history_turns is not None:
+            history = history[-self.history_turns:]
+        if self.max_history_tokens and self.token_counter:
+            sizes = [self.token_counter(q) + self.token_counter(a) for q, a in history]
+            while len(history) > 1 and sum(sizes) > self.max_history_tokens:
+                history.pop(0)
+                sizes.pop(0)
+        return history
+
+    @abstractmethod
+    def get(self, session_id: str) -> Session:
+        pass
+
+    @abstractmethod
+    async def count_question(self, session: Session) -> int:
+        """Count a new question in the session and return the running total."""
+
+    @abstractmethod
+    async def question_count(self, session_id: str) -> int:
+        """Questions asked so far in a session, without creating or touching it."""
+
+    async def refresh(self, session: Session):
+        """Reload history written elsewhere; a no-op when sessions are shared objects."""
+
+    @asynccontextmanager
+    async def turn(self, session: Session):
+        async with session.lock:
+            await self.refresh(session)
+            yield session
+
+    @abstractmethod
+    async def add_turn(self, session: Session, question: str, answer: str) -> bool:
+        """Record a turn; False if it could not be saved."""
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, int]:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local session store with idle-TTL and max-sessions LRU eviction.
+
+    Sessions are kept in least-recently-used order, so eviction only ever
+    looks at the front of the dict. A session whose lock is held (a turn is
+    in flight) is never evicted. Only correct with a single worker process.
+    """
+
+    def __init__(self, max_sessions: int = 5000, idle_ttl_seconds: float = 1800, **kwargs):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(session_id)
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_seen = time.monotonic()
+        self._evict(keep=session_id)
+        return session
+
+    def _evict(self, keep: str):
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        # Skip over (at most once) sessions that are busy at the front
+        for _ in range(len(self._sessions)):
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            over_capacity = len(self._sessions) > self.max_sessions
+            if not over_capacity and session.last_seen >= cutoff:
+                break
+            self._sessions.move_to_end(session_id)
+            if not session.lock.locked():
+                del self._sessions[session_id]
+                self.evicted += 1
+
+    async def count_question(self, session: Session) -> int:
+        session.question_count += 1
+        return session.question_count
+
+    async def question_count(self, session_id: str) -> int:
+        session = self._sessions.get(session_id)
+        return session.question_count if session else 0
+
+    async def add_turn(self, session: Session, question: str, answer: str) -> bool:
+        session.history = self.trim(session.history + [(question, answer)])
+        session.version += 1
+        return True
+
+    async def stats(self) -> Dict[str, int]:
+        history_turns = 0
+        history_bytes = 0
+        for session in self._sessions.values():
+            history_turns += len(session.history)
+            for question, answer in session.history:
+                history_bytes += len(question.encode("utf-8")) + len(answer.encode("utf-8"))
+        return {
+            "active_sessions": len(self._sessions),
+            "evicted_sessions": self.evicted,
+            "history_turns": history_turns,
+            "history_bytes": history_bytes,
+        }
+
+
+def encode_history(history: List[Tuple[str, str]]) -> bytes:
+    return zlib.compress(json.dumps(history, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def decode_history(blob: Optional[bytes]) -> List[Tuple[str, str]]:
+    if not blob:
+        return []
+    return [tuple(turn) for turn in json.loads(zlib.decompress(blob))]
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in one SQLite file (WAL), shared by all worker processes on a host.
+
+    Each row holds the zlib-compressed JSON history, the question count and a
+    version. Question counts are incremented in place; history writes are
+    optimistic: a turn is saved only if the version is still the one it was
+    read at, and otherwise re-applied on top of the newer history, so
+    concurrent turns of one session on different workers are both kept.
+    Idle and over-capacity sessions are deleted at most every
+    `cleanup_interval_seconds` by whichever worker gets there first. The
+    sqlite calls run in worker threads, each with its own connection.
+    """
+
+    MAX_SAVE_ATTEMPTS = 5
+
+    def __init__(self, path: str, max_sessions: int = 5000, idle_ttl_seconds: float = 1800,
+                 cleanup_interval_seconds: float = 60, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.cleanup_interval_seconds = cleanup_interval_seconds
+        self._local = threading.local()
+        # Turns of one session are still serialised within a process; the lock
+        # lives as long as some request holds the session
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._next_cleanup = 0.0
+        self._cleanup_lock = threading.Lock()
+        self.evicted = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    history BLOB,
+                    turns INTEGER NOT NULL DEFAULT 0,
+                    history_bytes INTEGER NOT NULL DEFAULT 0,
+                    question_count INTEGER NOT NULL DEFAULT 0,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    last_seen REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+            """)
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Session:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return Session(session_id, lock=lock)
+
+    async def count_question(self, session: Session) -> int:
+        return await asyncio.to_thread(self._count_question, session)
+
+    def _count_question(self, session: Session) -> int:
+        now = time.time()
+        # fetchall, not fetchone: a RETURNING statement holds its write lock until stepped to the end
+        ((count,),) = self._conn().execute("""
+            INSERT INTO sessions (session_id, question_count, last_seen) VALUES (?, 1, ?)
+            ON CONFLICT (session_id) DO UPDATE SET question_count = question_count + 1, last_seen = excluded.last_seen
+            RETURNING question_count
+        """, (session.session_id, now)).fetchall()
+        session.question_count = count
+        with self._cleanup_lock:
+            due = now >= self._next_cleanup
+            if due:
+                self._next_cleanup = now + self.cleanup_interval_seconds
+        if due:
+            self.cleanup(now)
+        return count
+
+    async def question_count(self, session_id: str) -> int:
+        return await asyncio.to_thread(self._question_count, session_id)
+
+    def _question_count(self, session_id: str) -> int:
+        row = self._conn().execute("SELECT question_count FROM sessions WHERE session_id = ?",
+                                   (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    async def refresh(self, session: Session):
+        await asyncio.to_thread(self._refresh, session)
+
+    def _refresh(self, session: Session):
+        row = self._conn().execute("SELECT history, question_count, version FROM sessions WHERE session_id = ?",
+                                   (session.session_id,)).fetchone()
+        if row is None:
+            session.history, session.version = [], 0
+        else:
+            session.history = decode_history(row[0])
+            session.question_count, session.version = row[1], row[2]
+
+    async def add_turn(self, session: Session, question: str, answer: str) -> bool:
+        return await asyncio.to_thread(self._add_turn, session, question, answer)
+
+    def _add_turn(self, session: Session, question: str, answer: str) -> bool:
+        conn = self._conn()
+        for _ in range(self.MAX_SAVE_ATTEMPTS):
+            history = self.trim(session.history + [(question, answer)])
+            size = sum(len(q.encode("utf-8")) + len(a.encode("utf-8")) for q, a in history)
+            saved = conn.execute("""
+                INSERT INTO sessions (session_id, history, turns, history_bytes, version, last_seen)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    history = excluded.history, turns = excluded.turns, history_bytes = excluded.history_bytes,
+                    version = version + 1, last_seen = excluded.last_seen
+                WHERE version = ?
+                RETURNING version
+            """, (session.session_id, encode_history(history), len(history), size, time.time(),
+                  session.version)).fetchall()
+            if saved:
+                session.history, session.version = history, saved[0][0]
+                return True
+            # Another worker saved a turn of this session since we read it
+            self._refresh(session)
+        return False
+
+    def cleanup(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        conn = self._conn()
+        expired = conn.execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.idle_ttl_seconds,)).rowcount
+        over = conn.execute("""
+            DELETE FROM sessions WHERE session_id IN (
+                SELECT session_id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)
+        """, (self.max_sessions,)).rowcount
+        with self._cleanup_lock:
+            self.evicted += expired + over
+
+    async def stats(self) -> Dict[str, int]:
+        return await asyncio.to_thread(self._stats)
+
+    def _stats(self) -> Dict[str, int]:
+        active, turns, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(turns), 0), COALESCE(SUM(history_bytes), 0) FROM sessions").fetchone()
+        return {
+            "active_sessions": active,
+            # Only what this process evicted
+            "evicted_sessions": self.evicted,
+            "history_turns": turns,
+            "history_bytes": size,
+        }
+
+
+def open_session_store(session_config: dict, token_counter: Optional[Callable[[str], int]] = None,
+                       base_dir: str = "") -> SessionStore:
+    """Build the store named by SESSION_BACKEND or `"backend"` in the sessions config."""
+    backend = os.getenv("SESSION_BACKEND", session_config.get("backend", "memory"))
+    common = dict(
+        max_sessions=session_config.get("max_sessions", 5000),
+        idle_ttl_seconds=session_config.get("idle_ttl_seconds", 1800),
+        history_turns=session_config.get("history_turns", 5),
+        max_history_tokens=session_config.get("max_history_tokens"),
+        token_counter=token_counter,
+    )
+    if backend == "memory":
+        return MemorySessionStore(**common)
+    if backend == "sqlite":
+        path = os.getenv("SESSION_DB_PATH", os.path.join(base_dir, session_config.get("sqlite_path", "sessions.sqlite3")))
+        return SQLiteSessionStore(path, cleanup_interval_seconds=session_config.get("cleanup_interval_seconds", 60),
+                                  **common)
+    raise ValueError(f"Unknown session backend {backend!r}, expected one of {SESSION_BACKENDS}")
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # Offline providers and a throwaway index, built by the app's warm-up
+    tmp = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in {"LLM_PROVIDER": "fake", "EMBEDDINGS_PROVIDER": "fake", "CHUNK_ENCODING": "bytes",
+                            "SESSION_BACKEND": "memory", "KNOWLEDGE_INDEX_PATH": str(tmp / "index"),
+                            "LEAD_DB_PATH": str(tmp / "leads.sqlite3")}.items():
+            patch.setenv(name, value)
+        import app
+        yield app
+
+
+@pytest.fixture(scope="module")
+def client(app_module):
+    with TestClient(app_module.app) as client:
+        deadline = time.monotonic() + 120
+        while client.get("/readyz").status_code != 200:
+            assert time.monotonic() < deadline, "the index did not load"
+            time.sleep(0.2)
+        yield client
+
+
+def stream(client, payload):
+    """The (event, data) pairs of an /ask/stream response."""
+    with client.stream("POST", "/ask/stream", json=payload) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_paraphrase_hits_answer_cache(client, app_module):
+    first = client.post("/ask", json={"user_query": "What is the interest rate on a home loan?",
+                                      "session_id": "paraphrase-1"}).json()
+    assert not first["is_cached"]
+    # Not the same text, so only a lookup by embedding finds it
+    second = client.post("/ask", json={"user_query": "what is the interest rate on a home loan please?",
+                                       "session_id": "paraphrase-2"}).json()
+    assert second["is_cached"]
+    assert second["bot_response"] == first["bot_response"]
+
+
+def test_cached_answer_scores_like_the_rag_answer(client):
+    # No product named, so the score includes the product of the top retrieved chunk
+    question = "How much does it cost?"
+    first = client.post("/ask", json={"user_query": question, "session_id": "score-1"}).json()
+    second = client.post("/ask", json={"user_query": question, "session_id": "score-2"}).json()
+    assert not first["is_cached"] and second["is_cached"]
+    assert second["intent_score"] == first["intent_score"] > 0
+
+
+def test_user_type_covers_the_conversation_score(client, app_module):
+    scorer = app_module.scorer
+    response = client.post("/ask", json={"user_query": "What documents are needed to apply?",
+                                         "session_id": "user-type", "intent_score": 4}).json()
+    total = 4 + response["intent_score"]
+    assert response["user_type"] == scorer.user_type(total)
+    assert response["lead_form"] == (total >= scorer.thresholds["lead_form"])
+    nudge = client.post("/nudge", json={"tabs": [], "seconds_on_page": 0, "intent_score": total}).json()
+    assert nudge["user_type"] == response["user_type"]
+
+
+def test_index_reload_runs_once_and_retries_after_a_failure(client, app_module, monkeypatch):
+    loads, retired = [], []
+    load_retriever = app_module.load_retriever
+
+    def flaky_load():
+        loads.append(1)
+        if len(loads) == 1:
+            raise OSError("index is half written")
+        time.sleep(0.1)
+        return load_retriever()
+
+    previous = app_module.rag_pipeline.retriever
+    monkeypatch.setattr(previous.store, "retire", lambda: retired.append(1))
+    monkeypatch.setattr(app_module, "load_retriever", flaky_load)
+    monkeypatch.setattr(app_module, "index_fingerprint", lambda: "rebuilt")
+
+    async def reload(times):
+        await asyncio.gather(*(app_module.reload_index_if_changed() for _ in range(times)))
+
+    client.portal.call(reload, 1)
+    assert app_module.rag_pipeline.retriever is previous
+    assert app_module.loaded_index_fingerprint != "rebuilt"
+    client.portal.call(reload, 3)
+    assert len(loads) == 2 and len(retired) == 1
+    assert app_module.rag_pipeline.retriever is not previous
+    assert app_module.loaded_index_fingerprint == "rebuilt"
+
+
+def test_stream_sends_tokens_then_done_and_is_cached(client):
+    payload = {"user_query": "Can I prepay my personal loan early?", "session_id": "stream-1", "intent_score": 2}
+    events = stream(client, payload)
+    names = [name for name, _ in events]
+    assert names[-1] == "done" and set(names[:-1]) == {"token"} and len(names) > 2
+    answer = "".join(data["text"] for _, data in events[:-1])
+    done = events[-1][1]
+    assert answer and done["sources"] and not done["is_cached"]
+    assert "bot_response" not in done
+    assert done["user_type"] and done["intent_score"] >= 0
+
+    # The same question from another visitor is served from the answer cache
+    events = stream(client, dict(payload, session_id="stream-2"))
+    assert [name for name, _ in events] == ["token", "done"]
+    assert events[0][1]["text"] == answer
+    cached = events[1][1]
+    assert cached["is_cached"] and cached["sources"] == done["sources"]
+    assert (cached["intent_score"], cached["user_type"]) == (done["intent_score"], done["user_type"])
@@ -0,0 +1,53 @@
+import asyncio
+
+from leads import LeadStore, LeadWriter
+
+
+def lead(**fields):
+    return dict({"name": "Asha", "email": "asha@example.com", "phone": "", "session_id": "s1",
+                 "source": "chatbot", "questions_asked": 2, "intent_score": 6}, **fields)
+
+
+def stored(store):
+    leads, _ = store.query()
+    assert len(leads) == 1
+    return leads[0]
+
+
+def test_repeat_submission_only_fills_blank_fields(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite3"), lambda score: "HOT_LEAD" if score >= 10 else "WARM_LEAD")
+    assert store.upsert_many([lead()]) == (1, 0)
+    # Same email in another case, from someone else's session
+    assert store.upsert_many([lead(name="Mallory", email=" ASHA@example.com", phone="+91 98765 43210",
+                                   session_id="s2", questions_asked=1, intent_score=12)]) == (0, 1)
+    row = stored(store)
+    assert (row["name"], row["session_id"], row["email"]) == ("Asha", "s1", "asha@example.com")
+    assert row["phone"] == "+91 98765 43210"
+    assert (row["questions_asked"], row["intent_score"], row["user_type"]) == (2, 12, "HOT_LEAD")
+    # The phone number now finds the same lead
+    store.upsert_many([lead(email="", phone="098765-43210", name="", session_id="")])
+    assert stored(store)["name"] == "Asha"
+
+
+def test_overwrite_replaces_name_and_session(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite3"), lambda score: "WARM_LEAD")
+    store.upsert_many([lead()])
+    store.upsert_many([lead(name="Asha Rao", session_id="s2", overwrite=True)])
+    row = stored(store)
+    assert (row["name"], row["session_id"]) == ("Asha Rao", "s2")
+
+
+def test_writer_merges_a_burst_in_one_batch(tmp_path):
+    store = LeadStore(str(tmp_path / "leads.sqlite3"), lambda score: "WARM_LEAD")
+
+    async def burst():
+        writer = LeadWriter(store, batch_size=10, flush_interval_seconds=0.05)
+        writer.start()
+        for i in range(5):
+            writer.submit(lead(questions_asked=i))
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(burst())
+    assert (writer.inserted, writer.merged, writer.failed) == (1, 4, 0)
+    assert stored(store)["questions_asked"] == 4
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+from sessions import SQLiteSessionStore
+
+
+def open_store(path, **kwargs):
+    return SQLiteSessionStore(str(path), history_turns=10, **kwargs)
+
+
+def test_concurrent_turns_from_two_workers_are_both_kept(tmp_path):
+    # Two stores on one file stand in for two worker processes
+    path = tmp_path / "sessions.sqlite3"
+    workers = [open_store(path), open_store(path)]
+    sessions = [store.get("shared") for store in workers]
+    for store, session in zip(workers, sessions):
+        store._refresh(session)
+    start = threading.Barrier(2)
+    saved = []
+
+    def turn(store, session, n):
+        start.wait()
+        saved.append(store._add_turn(session, f"question {n}", f"answer {n}"))
+
+    threads = [threading.Thread(target=turn, args=(store, session, n))
+               for n, (store, session) in enumerate(zip(workers, sessions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert saved == [True, True]
+    stored = workers[0].get("shared")
+    workers[0]._refresh(stored)
+    assert sorted(stored.history) == [("question 0", "answer 0"), ("question 1", "answer 1")]
+    assert stored.version == 2
+
+
+def test_stale_turn_is_reapplied_on_the_newer_history(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    first, second = open_store(path), open_store(path)
+    stale = second.get("s")
+    asyncio.run(second.refresh(stale))
+    fresh = first.get("s")
+    assert asyncio.run(first.add_turn(fresh, "q1", "a1"))
+    # `stale` was read at version 0; its save retries on top of q1
+    assert asyncio.run(second.add_turn(stale, "q2", "a2"))
+    assert stale.history == [("q1", "a1"), ("q2", "a2")] and stale.version == 2
+
+
+def test_add_turn_reports_a_turn_it_could_not_save(tmp_path, monkeypatch):
+    path = tmp_path / "sessions.sqlite3"
+    store = open_store(path)
+    session = store.get("s")
+    assert asyncio.run(store.add_turn(session, "q1", "a1"))
+    session.version = 0
+    # A reload that never catches up, as if other workers kept saving first
+    monkeypatch.setattr(store, "_refresh", lambda session: None)
+    assert not asyncio.run(store.add_turn(session, "q2", "a2"))
+    reader = open_store(path)
+    reread = reader.get("s")
+    asyncio.run(reader.refresh(reread))
+    assert reread.history == [("q1", "a1")]
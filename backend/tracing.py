@@ -0,0 +1,173 @@
+"""Request-scoped tracing: a request id plus time spent per pipeline stage.
+
+TracingMiddleware starts a Trace for every HTTP request (reusing a valid
+incoming X-Request-ID, else generating one) and echoes the id back in the
+response. Code anywhere below it, including worker threads started with
+asyncio.to_thread, wraps its work in `with stage("name"):`; every stage
+feeds the per-stage histogram and the current trace, and requests slower
+than `slow_request_ms` are logged with their stage breakdown and token
+counts. `logger` writes "[LEVEL] message" lines to stdout, as the rest of
+the backend's output looks.
+"""
+import logging
+import re
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import REGISTRY
+
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+HTTP_REQUESTS = REGISTRY.counter("salesbot_http_requests_total", "HTTP requests by route and status.",
+                                 ("route", "status"))
+HTTP_SECONDS = REGISTRY.histogram("salesbot_http_request_duration_seconds",
+                                  "HTTP request latency by route, until the last body byte.", ("route",))
+STAGE_SECONDS = REGISTRY.histogram("salesbot_stage_duration_seconds",
+                                   "Time spent per pipeline stage within a request.", ("stage",))
+LLM_TOKENS = REGISTRY.counter("salesbot_llm_tokens_total", "LLM tokens by direction (input/output).",
+                              ("direction",))
+LLM_IN_FLIGHT = REGISTRY.gauge("salesbot_llm_calls_in_flight", "LLM calls currently running.")
+SLOW_REQUESTS = REGISTRY.counter("salesbot_slow_requests_total", "Requests slower than slow_request_ms.")
+
+SLOW = logging.WARNING + 1
+logging.addLevelName(SLOW, "SLOW")
+logger = logging.getLogger("salesbot")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Trace:
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tokens: Dict[str, int] = {}
+        self.outcome: Optional[str] = None
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_tokens(self, direction: str, count: int):
+        self.tokens[direction] = self.tokens.get(direction, 0) + count
+
+    def summary(self, status: int, seconds: float) -> str:
+        stages = " ".join(f"{name}={value * 1000:.0f}ms" for name, value in self.stages.items()) or "-"
+        tokens = " ".join(f"{direction}={count}" for direction, count in self.tokens.items()) or "-"
+        return (f"{self.request_id} {self.method} {self.path} {status} {seconds * 1000:.0f}ms "
+                f"outcome={self.outcome or '-'} stages: {stages} tokens: {tokens}")
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def request_id() -> Optional[str]:
+    trace = _current.get()
+    return trace.request_id if trace else None
+
+
+def set_outcome(outcome: str):
+    trace = _current.get()
+    if trace is not None:
+        trace.outcome = outcome
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=name)
+        trace = _current.get()
+        if trace is not None:
+            trace.add_stage(name, seconds)
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """Counts in-flight LLM calls and token usage into the metrics and the trace."""
+
+    run_inline = True  # run on the caller's context, so the current trace is visible
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        LLM_IN_FLIGHT.inc()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        LLM_IN_FLIGHT.inc()
+
+    def on_llm_error(self, error, **kwargs):
+        LLM_IN_FLIGHT.dec()
+
+    def on_llm_end(self, response, **kwargs):
+        LLM_IN_FLIGHT.dec()
+        trace = _current.get()
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                for direction, key in (("input", "input_tokens"), ("output", "output_tokens")):
+                    LLM_TOKENS.inc(usage.get(key, 0), direction=direction)
+                    if trace is not None:
+                        trace.add_tokens(direction, usage.get(key, 0))
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed until their last byte."""
+
+    def __init__(self, app, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        trace = Trace(incoming if REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex,
+                      scope.get("method", ""), scope.get("path", ""))
+        token = _current.set(trace)
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers") or [])
+                headers.append((REQUEST_ID_HEADER, trace.request_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _current.reset(token)
+            self.finish(scope, trace, status)
+
+    def finish(self, scope, trace: Trace, status: int):
+        seconds = time.perf_counter() - trace.start
+        # The route template keeps label cardinality bounded (unknown paths share one)
+        route = getattr(scope.get("route"), "path", "unmatched")
+        HTTP_REQUESTS.inc(route=route, status=str(status))
+        HTTP_SECONDS.observe(seconds, route=route)
+        if self.slow_request_ms is not None and seconds * 1000 >= self.slow_request_ms:
+            SLOW_REQUESTS.inc()
+            logger.log(SLOW, trace.summary(status, seconds))
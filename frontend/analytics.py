@@ -0,0 +1,217 @@
+"""Running analytics over saved conversations, kept next to them in conversations.sqlite3.
+
+ConversationStore.save adds the difference each save makes (a new session,
+appended questions, a changed user type or lead flag) to a handful of
+counter rows in the same transaction, so the dashboard reads a fixed number
+of rows however many conversations there are. Top queries are counted per
+normalised query text, with an index on the count.
+
+The aggregates can be rebuilt by streaming the stored conversations in
+constant memory. Top queries are then kept with the Misra-Gries summary, so
+their counts are lower bounds (off by at most questions / (top_k + 1)). The
+scan reads a snapshot without blocking saves; what saves add meanwhile is
+carried over when the new aggregates are swapped in. An
+old conversation_history.json / JSON-lines log of any size is imported into
+the store first, so later saves of those sessions update the same totals.
+
+    python analytics.py                                # print the aggregates
+    python analytics.py rebuild                        # from conversations.sqlite3
+    python analytics.py rebuild conversation_history.json   # import it, then rebuild
+"""
+import json
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+USER_TYPES = ("HOT_LEAD", "WARM_LEAD", "BROWSING")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS analytics_queries (
+    query TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS analytics_queries_count ON analytics_queries (count);
+"""
+
+WHITESPACE_RE = re.compile(r"\s+")
+MAX_QUERY_CHARS = 200
+
+
+def normalize_query(query: str) -> str:
+    return WHITESPACE_RE.sub(" ", query).strip().lower()[:MAX_QUERY_CHARS]
+
+
+class Aggregates:
+    """Changes to the aggregates, added up in memory and written with `apply`."""
+
+    def __init__(self):
+        self.totals: Counter = Counter()
+        self.queries: Counter = Counter()
+
+    def add_conversation(self, user_type: str, lead_captured: bool, sign: int = 1):
+        self.totals[f"user_type:{user_type}"] += sign
+        self.totals["leads"] += sign * int(bool(lead_captured))
+
+    def add_question(self, query: str, faq_hit: bool, sign: int = 1):
+        self.totals["questions"] += sign
+        self.totals["faq_hits"] += sign * int(bool(faq_hit))
+        self.queries[normalize_query(query)] += sign
+
+    def apply(self, conn):
+        conn.executemany("""
+            INSERT INTO analytics_totals (name, value) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET value = value + excluded.value
+        """, [(name, value) for name, value in self.totals.items() if value])
+        conn.executemany("""
+            INSERT INTO analytics_queries (query, count) VALUES (?, ?)
+            ON CONFLICT (query) DO UPDATE SET count = count + excluded.count
+        """, [(query, count) for query, count in self.queries.items() if count and query])
+        if any(count < 0 for count in self.queries.values()):
+            conn.execute("DELETE FROM analytics_queries WHERE count <= 0")
+
+
+def read(conn, top_n: int = 5) -> dict:
+    totals = dict(conn.execute("SELECT name, value FROM analytics_totals"))
+    sessions = totals.get("sessions", 0)
+    questions = totals.get("questions", 0)
+    return {
+        "sessions": sessions,
+        "questions": questions,
+        "faq_hit_ratio": totals.get("faq_hits", 0) / questions if questions else 0.0,
+        "leads": totals.get("leads", 0),
+        "lead_conversion": totals.get("leads", 0) / sessions if sessions else 0.0,
+        "intent_distribution": {user_type: totals.get(f"user_type:{user_type}", 0) for user_type in USER_TYPES},
+        "top_queries": conn.execute(
+            "SELECT query, count FROM analytics_queries ORDER BY count DESC LIMIT ?", (top_n,)).fetchall(),
+    }
+
+
+class MisraGries:
+    """The items seen more than n / (k + 1) times in a stream of n, in k counters."""
+
+    def __init__(self, k: int):
+        self.k = k
+        self.counters: Dict[str, int] = {}
+
+    def add(self, item: str):
+        if item in self.counters:
+            self.counters[item] += 1
+        elif len(self.counters) < self.k:
+            self.counters[item] = 1
+        else:
+            for key in list(self.counters):
+                self.counters[key] -= 1
+                if not self.counters[key]:
+                    del self.counters[key]
+
+    def items(self) -> List[Tuple[str, int]]:
+        return sorted(self.counters.items(), key=lambda item: -item[1])
+
+
+def iter_json_log(path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Conversations from a JSON array (conversation_history.json) or a JSON-lines
+    file, decoded one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer = ""
+        in_array = None
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if in_array is None and buffer:
+                in_array = buffer[0] == "["
+                if in_array:
+                    buffer = buffer[1:]
+                continue
+            if in_array and buffer[:1] in (",", "]"):
+                buffer = buffer[1:]
+                continue
+            read_size = chunk_size
+            if buffer:
+                try:
+                    conversation, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # Grow reads with the buffer, so a huge conversation isn't re-parsed per chunk
+                    read_size = max(chunk_size, len(buffer))
+                else:
+                    # A number or literal cut off at the end of the buffer could decode early
+                    if end < len(buffer) or eof:
+                        yield conversation
+                        buffer = buffer[end:]
+                        continue
+            if eof:
+                return
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer += chunk
+
+
+def iter_stored(conn) -> Iterator[dict]:
+    """Stored conversations with their interactions, one at a time."""
+    for session_id, user_type, lead_captured in conn.execute(
+            "SELECT session_id, user_type, lead_captured FROM conversations"):
+        interactions = [{"query": query, "faq_hit": faq_hit} for query, faq_hit in conn.execute(
+            "SELECT query, faq_hit FROM interactions WHERE session_id = ? ORDER BY seq", (session_id,))]
+        yield {"session_id": session_id, "user_type": user_type, "lead_captured": lead_captured,
+               "interaction_log": interactions}
+
+
+def rebuild(store, top_k: int = 100) -> dict:
+    """Recompute the aggregates from the stored conversations and replace the
+    stored aggregates."""
+    aggregates = Aggregates()
+    top_queries = MisraGries(top_k)
+    with store.snapshot() as conn:
+        # The aggregates as of the snapshot, to tell what saves add during the scan
+        base_totals = dict(conn.execute("SELECT name, value FROM analytics_totals"))
+        conn.execute("DROP TABLE IF EXISTS temp.rebuild_base_queries")
+        conn.execute("CREATE TEMP TABLE rebuild_base_queries AS SELECT query, count FROM main.analytics_queries")
+        for conversation in iter_stored(conn):
+            aggregates.totals["sessions"] += 1
+            aggregates.add_conversation(conversation.get("user_type", "BROWSING"), conversation.get("lead_captured"))
+            for log in conversation.get("interaction_log", []):
+                aggregates.totals["questions"] += 1
+                aggregates.totals["faq_hits"] += int(bool(log.get("faq_hit")))
+                query = normalize_query(log.get("query", ""))
+                if query:
+                    top_queries.add(query)
+    aggregates.queries.update(dict(top_queries.items()))
+    # The write lock is only held for the swap
+    with store.transaction() as conn:
+        for name, value in conn.execute("SELECT name, value FROM analytics_totals"):
+            aggregates.totals[name] += value - base_totals.pop(name, 0)
+        for name, value in base_totals.items():
+            aggregates.totals[name] -= value
+        aggregates.queries.update(dict(conn.execute("""
+            SELECT query, SUM(count) FROM (
+                SELECT query, count FROM main.analytics_queries
+                UNION ALL SELECT query, -count FROM temp.rebuild_base_queries)
+            GROUP BY query HAVING SUM(count) != 0
+        """)))
+        conn.execute("DROP TABLE temp.rebuild_base_queries")
+        conn.execute("DELETE FROM analytics_totals")
+        conn.execute("DELETE FROM analytics_queries")
+        aggregates.apply(conn)
+    return store.analytics()
+
+
+if __name__ == "__main__":
+    from conversation_store import CONVERSATION_DB_PATH, ConversationStore
+    store = ConversationStore()
+    if sys.argv[1:2] == ["rebuild"] and len(sys.argv) <= 3:
+        if len(sys.argv) == 3:
+            print(f"Imported {store.import_json(sys.argv[2])} conversations into {CONVERSATION_DB_PATH}")
+        result = rebuild(store)
+        print(f"Rebuilt analytics in {CONVERSATION_DB_PATH}")
+    elif len(sys.argv) == 1:
+        result = store.analytics()
+    else:
+        raise SystemExit(__doc__)
+    print(json.dumps(result, indent=2))
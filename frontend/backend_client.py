@@ -0,0 +1,138 @@
+"""HTTP client for the FastAPI backend, shared by all Streamlit sessions of a process.
+
+One requests.Session keeps a pool of keep-alive connections. Every call has
+connect and read timeouts, so a hung backend can't pin a script thread.
+Idempotent calls are retried a bounded number of times with jittered
+exponential backoff; answers are never retried, since that would ask the
+LLM twice. A circuit breaker counts consecutive failures and, once open,
+fails calls immediately with CircuitOpen (the app shows a fallback
+response) until `reset_seconds` have passed and a trial call succeeds.
+"""
+import json
+import random
+import threading
+import time
+from typing import Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            # After the cool-down, let exactly one trial call through
+            if time.monotonic() - self._opened_at >= self.reset_seconds and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class BackendClient:
+    def __init__(self, base_url: str, connect_timeout: float = 3.05, read_timeout: float = 60,
+                 retries: int = 2, backoff_seconds: float = 0.3, pool_size: int = 20,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        # Retries are done here, where the breaker sees them
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        # Requests still running finish; their connections are dropped, not pooled
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter, so retrying sessions don't hit the backend in lockstep
+        return random.uniform(0, self.backoff_seconds * 2 ** attempt)
+
+    def _request(self, method: str, path: str, idempotent: bool, **kwargs) -> requests.Response:
+        if not self.breaker.allow():
+            raise CircuitOpen(f"Backend at {self.base_url} is failing; not calling it for now")
+        attempts = 1 + self.retries if idempotent else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last:
+                    self.breaker.record_failure()
+                    raise
+            except requests.exceptions.RequestException:
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    if response.status_code >= 500:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                    if not kwargs.get("stream"):
+                        response.raise_for_status()
+                    return response
+                response.close()
+            time.sleep(self._backoff(attempt))
+
+    def nudge(self, payload: dict) -> dict:
+        # Only reads the nudge rules, so safe to retry
+        return self._request("POST", "/nudge", idempotent=True, json=payload).json()
+
+    def submit_lead(self, lead: dict) -> dict:
+        # The backend merges duplicates by email/phone, so a retried submission is not stored twice
+        return self._request("POST", "/leads", idempotent=True, json=lead).json()
+
+    def stream_answer(self, payload: dict, final_event: dict) -> Iterator[str]:
+        """Stream an answer from /ask/stream. Yields answer text as it arrives (for
+        st.write_stream) and fills `final_event` with the closing sources/nudge
+        payload, or an "error" key if the backend reported one."""
+        with self._request("POST", "/ask/stream", idempotent=False, json=payload, stream=True) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "token":
+                        yield data["text"]
+                    elif event == "done":
+                        final_event.update(data)
+                    elif event == "error":
+                        final_event["error"] = data.get("detail", "")
+                        if data.get("status", 500) >= 500:
+                            self.breaker.record_failure()
@@ -0,0 +1,222 @@
+"""Per-visitor conversation storage for the Streamlit app, in one SQLite file.
+
+Messages and interactions are append-only rows keyed by (session_id, seq),
+and each conversation row records how many of them are stored, so a save
+only writes what was added since the last one and a load is a primary-key
+range scan. WAL mode and BEGIN IMMEDIATE transactions let concurrent
+Streamlit sessions (threads, or several server processes) write safely.
+Saves are versioned: a save based on an older version of the conversation
+than the stored one (another tab saved in between) is rejected rather than
+truncating what the other tab wrote. Each save also updates the running dashboard aggregates (see analytics.py).
+
+    python conversation_store.py conversation_history.json   # import the old JSON file
+"""
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import analytics
+
+CONVERSATION_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversations.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    session_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    question_count INTEGER NOT NULL DEFAULT 0,
+    intent_score INTEGER NOT NULL DEFAULT 0,
+    user_type TEXT NOT NULL,
+    lead_captured INTEGER NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    interaction_count INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS interactions (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    query TEXT NOT NULL,
+    intent_score INTEGER NOT NULL,
+    faq_hit INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class ConversationConflict(Exception):
+    """The conversation was saved elsewhere since the caller last loaded or saved it."""
+
+
+class ConversationStore:
+    def __init__(self, path: str = CONVERSATION_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA + analytics.SCHEMA)
+            # Files from before interactions recorded FAQ hits
+            if "faq_hit" not in {row[1] for row in conn.execute("PRAGMA table_info(interactions)")}:
+                conn.execute("ALTER TABLE interactions ADD COLUMN faq_hit INTEGER NOT NULL DEFAULT 0")
+            # ... and from before saves were versioned
+            if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(conversations)")}:
+                conn.execute("ALTER TABLE conversations ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._conn()
+        # Take the write lock up front, so two writers never deadlock upgrading a read
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def snapshot(self):
+        """A read transaction: everything read through it sees one version of
+        the file, without blocking writers (WAL)."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    def save(self, conversation: dict, version: Optional[int] = None) -> int:
+        """Store a conversation in the shape the app keeps it in session state
+        and return its new version.
+
+        `version` is the one the caller last loaded or saved (0 for a new
+        conversation); if the stored conversation has moved on since, nothing
+        is written and ConversationConflict is raised. None skips the check,
+        for imports. Only messages and interactions beyond the stored counts
+        are written; a shorter list than what is stored (history was cleared)
+        truncates it.
+        """
+        session_id = conversation["session_id"]
+        messages = conversation.get("messages", [])
+        interactions = conversation.get("interaction_log", [])
+        user_type = conversation.get("user_type", "BROWSING")
+        lead_captured = bool(conversation.get("lead_captured"))
+        aggregates = analytics.Aggregates()
+        with self.transaction() as conn:
+            row = conn.execute("""
+                SELECT message_count, interaction_count, user_type, lead_captured, version
+                FROM conversations WHERE session_id = ?
+            """, (session_id,)).fetchone()
+            stored_version = row[4] if row else 0
+            if version is not None and version != stored_version:
+                raise ConversationConflict(f"Conversation {session_id} is at version {stored_version}, "
+                                           f"not {version}")
+            if row is None:
+                stored_messages = stored_interactions = 0
+                aggregates.totals["sessions"] += 1
+            else:
+                stored_messages, stored_interactions, stored_user_type, stored_lead, _ = row
+                aggregates.add_conversation(stored_user_type, stored_lead, sign=-1)
+            aggregates.add_conversation(user_type, lead_captured)
+            if len(messages) < stored_messages:
+                conn.execute("DELETE FROM messages WHERE session_id = ? AND seq >= ?", (session_id, len(messages)))
+                stored_messages = len(messages)
+            if len(interactions) < stored_interactions:
+                for query, faq_hit in conn.execute("""
+                    DELETE FROM interactions WHERE session_id = ? AND seq >= ? RETURNING query, faq_hit
+                """, (session_id, len(interactions))).fetchall():
+                    aggregates.add_question(query, faq_hit, sign=-1)
+                stored_interactions = len(interactions)
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(session_id, seq, message["role"], message["content"])
+                 for seq, message in enumerate(messages[stored_messages:], start=stored_messages)])
+            new_interactions = interactions[stored_interactions:]
+            conn.executemany("""
+                INSERT INTO interactions (session_id, seq, timestamp, query, intent_score, faq_hit)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(session_id, seq, log["timestamp"], log["query"], log["intent_score"], int(bool(log.get("faq_hit"))))
+                  for seq, log in enumerate(new_interactions, start=stored_interactions)])
+            for log in new_interactions:
+                aggregates.add_question(log["query"], log.get("faq_hit"))
+            conn.execute("""
+                INSERT INTO conversations (session_id, timestamp, question_count, intent_score, user_type,
+                                           lead_captured, message_count, interaction_count, version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    timestamp = excluded.timestamp, question_count = excluded.question_count,
+                    intent_score = excluded.intent_score, user_type = excluded.user_type,
+                    lead_captured = excluded.lead_captured, message_count = excluded.message_count,
+                    interaction_count = excluded.interaction_count, version = excluded.version
+            """, (session_id, conversation["timestamp"], conversation.get("question_count", 0),
+                  conversation.get("intent_score", 0), user_type, int(lead_captured), len(messages),
+                  len(interactions), stored_version + 1))
+            aggregates.apply(conn)
+        return stored_version + 1
+
+    def load(self, session_id: str) -> Optional[dict]:
+        # One snapshot, so the messages match the version returned with them
+        with self.snapshot() as conn:
+            row = conn.execute("""
+                SELECT timestamp, question_count, intent_score, user_type, lead_captured, version
+                FROM conversations WHERE session_id = ?
+            """, (session_id,)).fetchone()
+            if row is None:
+                return None
+            timestamp, question_count, intent_score, user_type, lead_captured, version = row
+            messages = [{"role": role, "content": content} for role, content in conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq", (session_id,))]
+            interactions = [{"timestamp": ts, "query": query, "intent_score": score, "faq_hit": bool(faq_hit)}
+                            for ts, query, score, faq_hit in conn.execute("""
+                                SELECT timestamp, query, intent_score, faq_hit FROM interactions
+                                WHERE session_id = ? ORDER BY seq
+                            """, (session_id,))]
+        return {
+            "session_id": session_id,
+            "timestamp": timestamp,
+            "question_count": question_count,
+            "intent_score": intent_score,
+            "user_type": user_type,
+            "lead_captured": bool(lead_captured),
+            "messages": messages,
+            "interaction_log": interactions,
+            "version": version,
+        }
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def analytics(self, top_n: int = 5) -> dict:
+        """Dashboard aggregates over all saved conversations, kept up to date by `save`."""
+        return analytics.read(self._conn(), top_n)
+
+    def import_json(self, path: str) -> int:
+        """Import conversations from the old conversation_history.json format
+        (or a JSON-lines log of them), streamed one at a time."""
+        count = 0
+        for conversation in analytics.iter_json_log(path):
+            self.save(conversation)
+            count += 1
+        return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit(__doc__)
+    print(f"Imported {ConversationStore().import_json(sys.argv[1])} conversations into {CONVERSATION_DB_PATH}")
@@ -3,13 +3,23 @@ import time
 import requests
 import os
 import json
+import uuid
 from datetime import datetime
 import hashlib
+from backend_client import BackendClient, CircuitBreaker, CircuitOpen
+from conversation_store import ConversationConflict, ConversationStore
+from streamlit_autorefresh import st_autorefresh
 
 st.set_page_config(layout="wide", page_title="FinanceHub AI Assistant")
 
 API_URL = os.environ.get("API_URL", "http://localhost:8000")
 
+# One conversation per browser session; it is also the backend session id. The
+# id stays in session state and out of the URL, so a shared link can't be used
+# to read or continue someone else's conversation.
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 # Generate a unique session key for this page load
 # This will be different on every refresh
 def get_page_session_key():
@@ -24,20 +34,9 @@ if "page_session_key" not in st.session_state:
     st.session_state.nudge_shown = {}
     st.session_state.nudge_dismissed = {}
 
-# Check if this is a page refresh (new page load)
-current_time = time.time()
-if "last_activity_time" not in st.session_state:
-    st.session_state.last_activity_time = current_time
-
-# If more than 2 seconds have passed since last activity, treat as new page load
-if current_time - st.session_state.last_activity_time > 2:
-    st.session_state.page_session_key = get_page_session_key()
-    st.session_state.page_load_time = time.time()
-    st.session_state.tab_visit_time = {}
-    st.session_state.nudge_shown = {}
-    st.session_state.nudge_dismissed = {}
-
-st.session_state.last_activity_time = current_time
+# A browser refresh starts a new Streamlit session, so the block above already
+# resets the timers on every page load
+st.session_state.last_activity_time = time.time()
 
 # Custom CSS for better chat display
 st.markdown("""
@@ -51,16 +50,54 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load config.json
+# The backend's config.json (fallback responses, lead capture, client settings)
+CONFIG_PATH = os.environ.get("CONFIG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "..", "backend", "config.json"))
+
+# Parsed once per change of the file: the mtime is part of the cache key
+@st.cache_resource(max_entries=1)
+def read_config(path, mtime_ns):
+    with open(path, 'r') as f:
+        return json.load(f)
+
 def load_config():
     try:
-        with open('config.json', 'r') as f:
-            return json.load(f)
-    except:
+        return read_config(CONFIG_PATH, os.stat(CONFIG_PATH).st_mtime_ns)
+    except (OSError, ValueError):
         return {}
 
 config = load_config()
 
+# The client get_backend_client last built, so a settings change can close it
+@st.cache_resource
+def backend_clients():
+    return []
+
+# One pooled client per Streamlit process (see backend_client.py), rebuilt
+# when the URL or the "backend_client" settings change
+@st.cache_resource(max_entries=1)
+def get_backend_client(api_url, settings):
+    client = BackendClient(
+        api_url,
+        connect_timeout=settings.get("connect_timeout_seconds", 3.05),
+        read_timeout=settings.get("read_timeout_seconds", 60),
+        retries=settings.get("retries", 2),
+        backoff_seconds=settings.get("backoff_seconds", 0.3),
+        pool_size=settings.get("pool_size", 20),
+        breaker=CircuitBreaker(settings.get("failure_threshold", 5), settings.get("reset_seconds", 30)),
+    )
+    clients = backend_clients()
+    for previous in clients:
+        previous.close()
+    clients[:] = [client]
+    return client
+
+backend = get_backend_client(API_URL, config.get("backend_client", {}))
+
+def fallback_response(kind, default):
+    fallbacks = config.get('fallback_responses', {})
+    return fallbacks.get(kind) or fallbacks.get('no_answer') or default
+
 # Initialize session states (these persist across refreshes)
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -72,115 +109,143 @@ if "lead_captured" not in st.session_state:
     st.session_state.lead_captured = False
 if "user_intent_score" not in st.session_state:
     st.session_state.user_intent_score = 0
+# Classified by the backend along with answers and nudges (backend/scoring.py)
+if "user_type" not in st.session_state:
+    st.session_state.user_type = "BROWSING"
+if "lead_form_due" not in st.session_state:
+    st.session_state.lead_form_due = False
 if "interaction_log" not in st.session_state:
     st.session_state.interaction_log = []
 if "active_tab" not in st.session_state:
     st.session_state.active_tab = None
-
-# Configuration for nudge timing (in seconds)
-NUDGE_DELAY_SECONDS = 15  # Nudge appears after 15 seconds
-
-# Function to calculate user intent score
-def calculate_intent_score(query):
-    high_intent_keywords = ["price", "cost", "apply", "eligibility", "documents", "loan", "interest", "emi", "process"]
-    score = 0
-    query_lower = query.lower()
-    for keyword in high_intent_keywords:
-        if keyword in query_lower:
-            score += 2
-    return score
-
-# Function to save lead to JSON file
+# What the last save or load left in the store, to base the next save on
+if "saved_conversation" not in st.session_state:
+    st.session_state.saved_conversation = {"version": 0, "messages": 0, "interactions": 0,
+                                           "question_count": 0, "intent_score": 0}
+
+# Shared by all visitors of this server process
+@st.cache_resource
+def get_conversation_store():
+    return ConversationStore()
+
+conversation_store = get_conversation_store()
+
+# Nudge rules live in the backend ("tab_nudges" in backend/config.json); if it
+# can't be reached, ask again after this many seconds
+NUDGE_RETRY_SECONDS = 30
+
+# Questions are scored by the backend (backend/scoring.py), which also turns the
+# running score into a user type; page events are weighted from the same
+# "scoring" section of config.json
+scoring = config.get('scoring', {})
+
+def event_score(event):
+    return scoring.get('events', {}).get(event, 0)
+
+def update_user_type(data):
+    """Take the user type and lead form decision from a backend response; True if they changed."""
+    current = (st.session_state.user_type, st.session_state.lead_form_due)
+    st.session_state.user_type = data.get("user_type", st.session_state.user_type)
+    st.session_state.lead_form_due = data.get("lead_form", st.session_state.lead_form_due)
+    return (st.session_state.user_type, st.session_state.lead_form_due) != current
+
+# Function to save a lead; the backend deduplicates and stores it (POST /leads)
 def save_lead(name, email, phone=""):
     lead_data = {
         "name": name,
         "email": email,
         "phone": phone,
-        "timestamp": datetime.now().isoformat(),
+        "session_id": st.session_state.session_id,
         "source": "chatbot",
         "questions_asked": st.session_state.question_count,
         "intent_score": st.session_state.user_intent_score,
-        "user_type": "HOT_LEAD" if st.session_state.user_intent_score > 5 else "WARM_LEAD"
     }
     
     try:
-        with open('leads.json', 'a') as f:
-            json.dump(lead_data, f)
-            f.write('\n')
+        backend.submit_lead(lead_data)
         return True
-    except:
+    except (CircuitOpen, requests.exceptions.RequestException) as e:
+        print(f"Error saving lead: {e}")
         return False
 
-# Function to save conversation history
-def save_conversation_history():
-    """Save the current conversation to a JSON file"""
-    conversation_data = {
-        "session_id": "streamlit_session",
-        "timestamp": datetime.now().isoformat(),
+SAVE_ATTEMPTS = 3
+
+def remember_saved(version):
+    st.session_state.saved_conversation = {
+        "version": version,
+        "messages": len(st.session_state.messages),
+        "interactions": len(st.session_state.interaction_log),
         "question_count": st.session_state.question_count,
         "intent_score": st.session_state.user_intent_score,
-        "user_type": "HOT_LEAD" if st.session_state.user_intent_score > 5 else "WARM_LEAD" if st.session_state.user_intent_score > 0 else "BROWSING",
-        "lead_captured": st.session_state.lead_captured,
-        "messages": st.session_state.messages,
-        "interaction_log": st.session_state.interaction_log
     }
-    
-    try:
-        # Read existing conversations
+
+# Function to save conversation history
+def save_conversation_history():
+    """Save the current conversation; only messages added since the last save are written.
+
+    If the stored conversation changed since (the same conversation saved from
+    elsewhere), it is reloaded and this session's unsaved turns are added after it.
+    """
+    for _ in range(SAVE_ATTEMPTS):
+        saved = st.session_state.saved_conversation
+        conversation_data = {
+            "session_id": st.session_state.session_id,
+            "timestamp": datetime.now().isoformat(),
+            "question_count": st.session_state.question_count,
+            "intent_score": st.session_state.user_intent_score,
+            "user_type": st.session_state.user_type,
+            "lead_captured": st.session_state.lead_captured,
+            "messages": st.session_state.messages,
+            "interaction_log": st.session_state.interaction_log
+        }
         try:
-            with open('conversation_history.json', 'r') as f:
-                conversations = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            conversations = []
-        
-        # Check if this session already exists and update it
-        session_exists = False
-        for i, conv in enumerate(conversations):
-            if conv.get("session_id") == "streamlit_session":
-                conversations[i] = conversation_data
-                session_exists = True
-                break
-        
-        # If new session, append it
-        if not session_exists:
-            conversations.append(conversation_data)
-        
-        # Write back to file
-        with open('conversation_history.json', 'w') as f:
-            json.dump(conversations, f, indent=2)
-        
-        return True
-    except Exception as e:
-        print(f"Error saving conversation: {e}")
-        return False
+            remember_saved(conversation_store.save(conversation_data, version=saved["version"]))
+            return True
+        except ConversationConflict:
+            new_messages = st.session_state.messages[saved["messages"]:]
+            new_interactions = st.session_state.interaction_log[saved["interactions"]:]
+            new_questions = st.session_state.question_count - saved["question_count"]
+            new_score = st.session_state.user_intent_score - saved["intent_score"]
+            lead_captured = st.session_state.lead_captured
+            if not load_conversation_history():
+                return False
+            st.session_state.messages = st.session_state.messages + new_messages
+            st.session_state.interaction_log = st.session_state.interaction_log + new_interactions
+            st.session_state.question_count += new_questions
+            st.session_state.user_intent_score += new_score
+            st.session_state.lead_captured = st.session_state.lead_captured or lead_captured
+        except Exception as e:
+            print(f"Error saving conversation: {e}")
+            return False
+    print("Error saving conversation: it kept changing while saving")
+    return False
 
 # Function to load conversation history
 def load_conversation_history():
     """Load existing conversation history if available"""
     try:
-        with open('conversation_history.json', 'r') as f:
-            conversations = json.load(f)
-            
-        # Find the current session
-        for conv in conversations:
-            if conv.get("session_id") == "streamlit_session":
-                # Restore session state
-                st.session_state.messages = conv.get("messages", [])
-                st.session_state.question_count = conv.get("question_count", 0)
-                st.session_state.user_intent_score = conv.get("intent_score", 0)
-                st.session_state.lead_captured = conv.get("lead_captured", False)
-                st.session_state.interaction_log = conv.get("interaction_log", [])
-                return True
-    except:
-        pass
-    return False
+        conv = conversation_store.load(st.session_state.session_id)
+    except Exception as e:
+        print(f"Error loading conversation: {e}")
+        return False
+    if conv is None:
+        return False
+    # Restore session state
+    st.session_state.messages = conv["messages"]
+    st.session_state.question_count = conv["question_count"]
+    st.session_state.user_intent_score = conv["intent_score"]
+    st.session_state.user_type = conv["user_type"]
+    st.session_state.lead_captured = conv["lead_captured"]
+    st.session_state.interaction_log = conv["interaction_log"]
+    remember_saved(conv["version"])
+    return True
 
 st.sidebar.markdown("## 💬 FinanceHub AI Assistant")
 st.sidebar.markdown("---")
 
 
-if st.session_state.user_intent_score > 0:
-    if st.session_state.user_intent_score > 5:
+if st.session_state.user_type != "BROWSING":
+    if st.session_state.user_type == "HOT_LEAD":
         st.sidebar.success(f"🔥 Hot Lead (Score: {st.session_state.user_intent_score})")
     else:
         st.sidebar.info(f"👤 Interested User (Score: {st.session_state.user_intent_score})")
@@ -191,7 +256,7 @@ if st.session_state.focus_chat:
     st.session_state.focus_chat = False
 
 # Lead capture form - shows after 2 questions for high-intent users
-if st.session_state.question_count >= 2 and not st.session_state.lead_captured and st.session_state.user_intent_score > 3:
+if st.session_state.question_count >= 2 and not st.session_state.lead_captured and st.session_state.lead_form_due:
     with st.sidebar.container():
         st.warning("💡 I can provide personalized loan options for you! Quick details please:")
         
@@ -210,6 +275,9 @@ if st.session_state.question_count >= 2 and not st.session_state.lead_captured a
                         st.sidebar.success(success_msg)
                         st.session_state.last_activity_time = time.time()
                         st.rerun()
+                    else:
+                        st.sidebar.error(fallback_response('service_unavailable',
+                                                           "Sorry, we couldn't save your details. Please try again."))
                 else:
                     st.sidebar.error("Please fill Name and Email")
 
@@ -229,56 +297,67 @@ if user_input:
     # Update activity time
     st.session_state.last_activity_time = time.time()
     
-    # Calculate intent score
-    intent_score = calculate_intent_score(user_input)
-    st.session_state.user_intent_score += intent_score
-    
     # Add user message
     st.session_state.messages.append({"role": "user", "content": user_input})
     st.session_state.question_count += 1
     
-    # Log interaction
-    st.session_state.interaction_log.append({
-        "timestamp": datetime.now().isoformat(),
-        "query": user_input,
-        "intent_score": intent_score
-    })
-    
     # Call backend API
     payload = {
         "user_query": user_input, 
-        "session_id": "streamlit_session"
+        "session_id": st.session_state.session_id,
+        "intent_score": st.session_state.user_intent_score
     }
     
-    try:
-        response = requests.post(f"{API_URL}/ask", json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            ai_message = data.get("bot_response", "No response from model")
-            
-            # Add instant FAQ indicator
-            if data.get("is_instant_faq"):
-                ai_message = f"✨ {ai_message}"
-            
-            # Add source information if available (for both FAQ and RAG)
-            sources = data.get("sources", [])
-            if sources and sources != [None] and sources != ['']:
-                ai_message += f"\n\n📚 *Source: {', '.join(sources)}*"
+    # Render the new turn right away; the answer streams in below it
+    with chat_container:
+        with st.chat_message("user"):
+            st.markdown(user_input)
+        with st.chat_message("assistant"):
+            final_event = {}
+            try:
+                ai_message = st.write_stream(backend.stream_answer(payload, final_event))
+                if not isinstance(ai_message, str):
+                    ai_message = "".join(str(part) for part in ai_message)
                 
-            # Add nudge if present
-            if data.get("nudge"):
-                ai_message += f"\n\n{data['nudge']}"
-                
-        else:
-            ai_message = config.get('fallback_responses', {}).get('no_answer', 
-                                   f"⚠️ Error {response.status_code}")
-    except requests.exceptions.RequestException as e:
-        ai_message = config.get('fallback_responses', {}).get('no_answer', 
-                               f"⚠️ Connection error: {e}")
+                if "error" in final_event:
+                    ai_message = fallback_response('no_answer', f"⚠️ Error: {final_event['error']}")
+                else:
+                    # Add instant FAQ indicator
+                    if final_event.get("is_instant_faq"):
+                        ai_message = f"✨ {ai_message}"
+                    
+                    # Add source information if available (for both FAQ and RAG)
+                    sources = final_event.get("sources", [])
+                    if sources and sources != [None] and sources != ['']:
+                        ai_message += f"\n\n📚 *Source: {', '.join(sources)}*"
+                        
+                    # Add nudge if present
+                    if final_event.get("nudge"):
+                        ai_message += f"\n\n{final_event['nudge']}"
+            except CircuitOpen:
+                ai_message = fallback_response('service_unavailable',
+                                               "⚠️ Our assistant is temporarily unavailable. Please try again shortly.")
+            except requests.exceptions.HTTPError as e:
+                ai_message = fallback_response('no_answer', f"⚠️ Error {e.response.status_code}")
+            except requests.exceptions.RequestException as e:
+                ai_message = fallback_response('no_answer', f"⚠️ Connection error: {e}")
 
     # Add assistant message
     st.session_state.messages.append({"role": "assistant", "content": ai_message})
     
+    # The backend scores the question along with the answer
+    intent_score = final_event.get("intent_score", 0)
+    st.session_state.user_intent_score += intent_score
+    update_user_type(final_event)
+    
+    # Log interaction
+    st.session_state.interaction_log.append({
+        "timestamp": datetime.now().isoformat(),
+        "query": user_input,
+        "intent_score": intent_score,
+        "faq_hit": bool(final_event.get("is_instant_faq"))
+    })
+    
     # Save conversation after each interaction
     save_conversation_history()
     
@@ -305,8 +384,7 @@ page_content = {
         • Flexible tenure up to 30 years
         • Quick approval in 48 hours
         • Minimal documentation
-        """,
-        "nudge": "🏠 Looking to buy your dream home? I can help calculate your EMI and check eligibility instantly!"
+        """
     },
     "💰 Personal Loans": {
         "text": """
@@ -317,8 +395,7 @@ page_content = {
         • No collateral required
         • Same day disbursal
         • Minimal documentation
-        """,
-        "nudge": "💳 Need quick funds? Let me check your eligibility in just 30 seconds!"
+        """
     },
     "🚗 Car Loans": {
         "text": """
@@ -329,8 +406,7 @@ page_content = {
         • Tenure up to 7 years
         • Quick processing
         • Easy EMI options
-        """,
-        "nudge": "🚗 Ready to buy your dream car? I can help you with the best loan options and instant EMI calculation!"
+        """
     },
     "💼 Business Loans": {
         "text": """
@@ -341,12 +417,48 @@ page_content = {
         • Quick disbursal in 3 days
         • Flexible repayment options
         • Dedicated relationship manager
-        """,
-        "nudge": "📈 Want to expand your business? Let's discuss the best loan options tailored for your needs!"
+        """
     }
 }
 
 
+# Which tabs show a nudge now, and when the next one is due. The decision is
+# kept until then (or until the intent score or dismissals change), so reruns
+# in between cost no request.
+def fetch_nudges():
+    dismissed = [tab_name for tab_name in page_content
+                 if st.session_state.nudge_dismissed.get(f"nudge_dismissed_{tab_name}")]
+    key = (st.session_state.user_intent_score, tuple(dismissed), st.session_state.page_load_time)
+    now = time.time()
+    decision = st.session_state.get("nudge_decision")
+    if decision and decision["key"] == key and (decision["check_at"] is None or now < decision["check_at"]):
+        return decision
+    payload = {
+        "session_id": st.session_state.session_id,
+        "tabs": list(page_content),
+        "seconds_on_page": now - st.session_state.page_load_time,
+        "intent_score": st.session_state.user_intent_score,
+        "dismissed": dismissed,
+    }
+    try:
+        data = backend.nudge(payload)
+        nudges, next_check = data.get("nudges", {}), data.get("next_check_seconds")
+    except (CircuitOpen, requests.exceptions.RequestException, ValueError):
+        data, nudges, next_check = {}, {}, NUDGE_RETRY_SECONDS
+    decision = {"key": key, "nudges": nudges, "check_at": now + next_check if next_check is not None else None}
+    st.session_state.nudge_decision = decision
+    # A page event changed the score: the sidebar above was drawn with the old user type
+    if update_user_type(data):
+        st.rerun()
+    return decision
+
+nudge_decision = fetch_nudges()
+if nudge_decision["check_at"] is not None:
+    # One browser-side timer for the whole page, due when the next nudge is;
+    # once no nudge is pending it is not rendered and idle pages stay idle
+    st_autorefresh(interval=max(1000, int((nudge_decision["check_at"] - time.time()) * 1000) + 250),
+                   key="nudge_timer")
+
 tabs = st.tabs(list(page_content.keys()))
 
 for idx, (tab, (tab_name, content)) in enumerate(zip(tabs, page_content.items())):
@@ -362,21 +474,21 @@ for idx, (tab, (tab_name, content)) in enumerate(zip(tabs, page_content.items())
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("📊 Calculate EMI", key=f"emi_{tab_name}"):
-                st.session_state.user_intent_score += 3
+                st.session_state.user_intent_score += event_score("calculate_emi")
                 st.session_state.focus_chat = True
                 st.session_state.last_activity_time = time.time()
                 save_conversation_history()
                 st.rerun()
         with col2:
             if st.button("✅ Check Eligibility", key=f"elig_{tab_name}"):
-                st.session_state.user_intent_score += 3
+                st.session_state.user_intent_score += event_score("check_eligibility")
                 st.session_state.focus_chat = True
                 st.session_state.last_activity_time = time.time()
                 save_conversation_history()
                 st.rerun()
         with col3:
             if st.button("📄 Required Documents", key=f"docs_{tab_name}"):
-                st.session_state.user_intent_score += 2
+                st.session_state.user_intent_score += event_score("required_documents")
                 st.session_state.focus_chat = True
                 st.session_state.last_activity_time = time.time()
                 save_conversation_history()
@@ -391,21 +503,19 @@ for idx, (tab, (tab_name, content)) in enumerate(zip(tabs, page_content.items())
         if nudge_dismissed_key not in st.session_state.nudge_dismissed:
             st.session_state.nudge_dismissed[nudge_dismissed_key] = False
         
-        # Calculate time spent on this tab (from page load, not tab visit)
-        time_since_page_load = time.time() - st.session_state.page_load_time
-        
         # Show nudge logic
         if not st.session_state.nudge_dismissed[nudge_dismissed_key]:
-            if time_since_page_load >= NUDGE_DELAY_SECONDS:
+            nudge_message = nudge_decision["nudges"].get(tab_name)
+            if nudge_message:
                 # Show the nudge
-                st.success(content["nudge"])
+                st.success(nudge_message)
                 
                 # Nudge action buttons
                 col1, col2, col3 = st.columns([1, 1, 5])
                 with col1:
                     if st.button("💬 Chat Now", key=f"chat_btn_{tab_name}"):
                         st.session_state.focus_chat = True
-                        st.session_state.user_intent_score += 1
+                        st.session_state.user_intent_score += event_score("chat_now")
                         st.session_state.last_activity_time = time.time()
                         save_conversation_history()
                         st.rerun()
@@ -415,18 +525,8 @@ for idx, (tab, (tab_name, content)) in enumerate(zip(tabs, page_content.items())
                         st.session_state.last_activity_time = time.time()
                         save_conversation_history()
                         st.rerun()
-            else:
-                # Show countdown
-                remaining_time = NUDGE_DELAY_SECONDS - int(time_since_page_load)
-                if remaining_time > 0:
-                    # Create an empty container for auto-refresh
-                    placeholder = st.empty()
-                    with placeholder.container():
-                        st.info(f"💡 Want to know more? Chat option available in {remaining_time} seconds...")
-                    
-                    # Auto-refresh every second
-                    time.sleep(1)
-                    st.rerun()
+            elif nudge_decision["check_at"] is not None:
+                st.info("💡 Want to know more? Our assistant will be right with you...")
 
 # Analytics Dashboard
 with st.expander("📊 Session Analytics & History"):
@@ -436,8 +536,8 @@ with st.expander("📊 Session Analytics & History"):
         st.metric("Questions Asked", st.session_state.question_count)
     
     with col2:
-        user_type = "Hot Lead" if st.session_state.user_intent_score > 5 else "Warm Lead" if st.session_state.user_intent_score > 0 else "Browsing"
-        st.metric("User Type", user_type)
+        user_type_label = {"HOT_LEAD": "Hot Lead", "WARM_LEAD": "Warm Lead", "BROWSING": "Browsing"}
+        st.metric("User Type", user_type_label[st.session_state.user_type])
     
     with col3:
         st.metric("Intent Score", st.session_state.user_intent_score)
@@ -465,6 +565,8 @@ with st.expander("📊 Session Analytics & History"):
             st.session_state.messages = []
             st.session_state.question_count = 0
             st.session_state.user_intent_score = 0
+            st.session_state.user_type = "BROWSING"
+            st.session_state.lead_form_due = False
             st.session_state.interaction_log = []
             st.session_state.lead_captured = False
             st.session_state.nudge_shown = {}
@@ -474,10 +576,28 @@ with st.expander("📊 Session Analytics & History"):
             save_conversation_history()
             st.rerun()
     
-    # Show saved conversations count
+    # All saved conversations, from the aggregates kept up to date on save
     try:
-        with open('conversation_history.json', 'r') as f:
-            conversations = json.load(f)
-            st.markdown(f"**Total saved conversations:** {len(conversations)}")
-    except:
+        totals = conversation_store.analytics()
+    except Exception:
+        totals = None
+    if totals and totals["sessions"]:
+        st.markdown("### All Conversations")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Sessions", totals["sessions"])
+        with col2:
+            st.metric("Questions", totals["questions"])
+        with col3:
+            st.metric("FAQ Hit Rate", f"{totals['faq_hit_ratio']:.0%}")
+        with col4:
+            st.metric("Lead Conversion", f"{totals['lead_conversion']:.0%}")
+        distribution = totals["intent_distribution"]
+        st.markdown(f"**Hot leads:** {distribution['HOT_LEAD']} · **Warm leads:** {distribution['WARM_LEAD']} · "
+                    f"**Browsing:** {distribution['BROWSING']}")
+        if totals["top_queries"]:
+            st.markdown("**Top questions**")
+            for query, count in totals["top_queries"]:
+                st.text(f"• {query[:50]} ({count})")
+    else:
         st.markdown("**No saved conversations yet**")
\ No newline at end of file
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from conversation_store import ConversationConflict, ConversationStore
+
+
+def conversation(session_id, *questions):
+    messages, log = [], []
+    for question in questions:
+        messages += [{"role": "user", "content": question}, {"role": "assistant", "content": f"re: {question}"}]
+        log.append({"timestamp": "2025-09-01T00:00:00", "query": question, "intent_score": 1, "faq_hit": False})
+    return {"session_id": session_id, "timestamp": "2025-09-01T00:00:00", "question_count": len(questions),
+            "intent_score": len(questions), "user_type": "WARM_LEAD", "lead_captured": False,
+            "messages": messages, "interaction_log": log}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConversationStore(str(tmp_path / "conversations.sqlite3"))
+
+
+def test_stale_save_is_rejected_without_losing_turns(store):
+    version = store.save(conversation("s", "A1"), version=0)
+    # Two tabs both saw version 1; tab A saves first
+    store.save(conversation("s", "A1", "A2"), version=version)
+    with pytest.raises(ConversationConflict):
+        store.save(conversation("s", "B1"), version=version)
+    stored = store.load("s")
+    assert [log["query"] for log in stored["interaction_log"]] == ["A1", "A2"]
+    # Tab B reloads, adds its turn after A's and saves on the new version
+    merged = conversation("s", "A1", "A2", "B1")
+    store.save(merged, version=stored["version"])
+    assert [log["query"] for log in store.load("s")["interaction_log"]] == ["A1", "A2", "B1"]
+    assert store.analytics()["questions"] == 3
+
+
+def test_concurrent_writers_keep_every_turn(store):
+    store.save(conversation("s"), version=0)
+
+    def writer(name):
+        for turn in range(10):
+            while True:
+                stored = store.load("s")
+                questions = [log["query"] for log in stored["interaction_log"]] + [f"{name}{turn}"]
+                try:
+                    store.save(conversation("s", *questions), version=stored["version"])
+                    break
+                except ConversationConflict:
+                    continue
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in "AB"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queries = [log["query"] for log in store.load("s")["interaction_log"]]
+    assert sorted(queries) == sorted(f"{name}{turn}" for name in "AB" for turn in range(10))
+    assert store.analytics()["questions"] == 20
+    assert store.analytics()["sessions"] == 1
+
+
+def test_rebuild_does_not_block_saves_and_keeps_them(store, monkeypatch):
+    import analytics
+    for session_id in "abc":
+        store.save(conversation(session_id, "rates?", "fees?"), version=0)
+    scan = analytics.iter_stored
+
+    def scan_with_a_save(conn):
+        for index, stored in enumerate(scan(conn)):
+            if index == 1:
+                # A visitor saves mid-scan, from another thread and connection
+                saver = threading.Thread(target=store.save, args=(conversation("d", "rates?"),), kwargs={"version": 0})
+                saver.start()
+                saver.join(timeout=5)
+                assert not saver.is_alive(), "the save waited for the rebuild"
+            yield stored
+
+    monkeypatch.setattr(analytics, "iter_stored", scan_with_a_save)
+    result = analytics.rebuild(store)
+    assert result["sessions"] == 4
+    assert result["questions"] == 7
+    assert dict(result["top_queries"]) == {"rates?": 4, "fees?": 3}